@@ -2,385 +2,139 @@
 Basketball statistics application adapted from https://github.com/neuml/txtai/blob/master/examples/baseball.py
 Code is heavily adapted from David Mezzetti
 
-Using txtai and Streamlit
+Using NumPy (or optionally txtai) and Streamlit
 
-Install txtai and streamlit (>= 1.23) to run:
-  pip install txtai streamlit
+Install streamlit (>= 1.23) to run:
+  pip install streamlit
+
+Install txtai to use the txtai search backend:
+  pip install txtai
 """
 
-print("STARTING IMPORTS...")
-import datetime
-import math
 import os
 import random
-
-print("DONE WITH DEFAULTS")
+import threading
 
 import altair as alt
-
-print("Alt")
-import numpy as np
 import pandas as pd
-
-print("pd,np")
 import streamlit as st
 
-print("Streamlit DONE")
-
-from txtai.embeddings import Embeddings
-
-print("DONE WITH IMPORTS")
+from stats import Counting, Per36, PerGame
 
 
-class Stats:
+class Category:
     """
-    Base stats class. Contains methods for loading, indexing and searching stats.
+    Lazy handle to a stats category. Stats are built on first use, at most once, from either the
+    request thread or a background warm up thread.
     """
 
-    def __init__(self):
-        """
-        Creates a new Stats instance.
-        """
-
-        # Load columns
-        self.columns = self.loadcolumns()
-
-        # Load stats data
-        self.stats = self.load()
-
-        # Load names
-        self.names = self.loadnames()
-
-        # Build index
-        self.vectors, self.data, self.embeddings = self.index()
-
-    def loadcolumns(self):
-        """
-        Returns a list of data columns.
-
-        Returns:
-            list of columns
-        """
-
-        columns = self.columns
-        return columns
-
-        raise NotImplementedError
-
-    def load(self):
+    def __init__(self, create):
         """
-        Loads and returns raw stats.
+        Creates a new Category handle.
 
-        Returns:
-            stats
+        Args:
+            create: callable that builds the Stats instance
         """
 
-        raise NotImplementedError
+        self.create = create
+        self.stats = None
+        self.lock = threading.Lock()
 
-    def metric(self):
+    def get(self):
         """
-        Primary metric column.
+        Gets the stats for this category, building them if necessary.
 
         Returns:
-            metric column name
+            Stats
         """
-        return "PTS"
-        raise NotImplementedError
 
-    def vector(self, row):
-        """
-        Build a vector for input row.
+        # Concurrent callers wait for a single build
+        with self.lock:
+            if self.stats is None:
+                self.stats = self.create()
 
-        Args:
-            row: input row
+        return self.stats
 
-        Returns:
-            row vector
+    def ready(self):
         """
-
-        raise NotImplementedError
-
-    def loadnames(self):
-        """
-        Loads a name - player id dictionary.
+        Checks if the stats for this category are built.
 
         Returns:
-            {player name: player id}
+            True if built
         """
 
-        # Get unique names
-        names = {}
-        rows = (
-            self.stats.sort_values(by=self.metric(), ascending=False)[
-                ["PLAYER_ID", "PLAYER_NAME"]
-            ]
-            .drop_duplicates()
-            .reset_index()
-        )
-        for x, row in rows.iterrows():
-            # Name key
-            key = f'{row["PLAYER_NAME"]}'
-            key += f" ({row['PLAYER_ID']})" if key in names else ""
-
-            if key not in names:
-                # Scale scores of top n players
-                exponent = 2 if ((len(rows) - x) / len(rows)) >= 0.95 else 1
-
-                # score = num seasons ^ exponent
-                score = math.pow(
-                    len(self.stats[self.stats["PLAYER_ID"] == row["PLAYER_ID"]]),
-                    exponent,
-                )
+        return self.stats is not None
 
-                # Save name key - values pair
-                names[key] = (row["PLAYER_ID"], score)
 
-        return names
+class Application:
+    """
+    Main application.
+    """
 
-    def index(self):
+    def __init__(self):
         """
-        Builds an embeddings index to stats data. Returns vectors, input data and embeddings index.
-
-        Returns:
-            vectors, data, embeddings
+        Creates a new application.
         """
+        print("INITIALIZING")
 
-        # Build data dictionary
-        vectors = {
-            f'{row["SEASON_ID"]}{row["PLAYER_ID"]}': self.transform(row)
-            for _, row in self.stats.iterrows()
-        }
-        data = {
-            f'{row["SEASON_ID"]}{row["PLAYER_ID"]}': dict(row)
-            for _, row in self.stats.iterrows()
-        }
+        # Cache built indexes across restarts
+        cache = os.environ.get("STATS_CACHE", "../.cache")
 
-        embeddings = Embeddings(
-            {
-                "transform": self.transform,
-            }
-        )
+        # Search backend
+        backend = os.environ.get("STATS_BACKEND", "numpy")
 
-        embeddings.index((uid, vectors[uid], None) for uid in vectors)
+        # Stat categories, built on demand
+        self.categories = {
+            "Totals": Category(lambda: Counting(cache, backend)),
+            "Per Game": Category(lambda: PerGame(cache, backend)),
+            "Per 36": Category(lambda: Per36(cache, backend)),
+        }
 
-        return vectors, data, embeddings
+        # Background warm up thread, started on first request
+        self.warmup = None
 
-    def metrics(self, name):
+    def stats(self, category):
         """
-        Looks up a player's active years, best statistical year and key metrics.
+        Gets stats for a category. The selected category is built on demand, then the remaining
+        categories are warmed up on a background thread.
 
         Args:
-            name: player name
+            category: category name
 
         Returns:
-            active, best, metrics
+            Stats
         """
 
-        if name in self.names:
-            # Get player stats
-            stats = self.stats[self.stats["PLAYER_ID"] == self.names[name][0]]
-
-            # Build key metrics
-            metrics = stats[["SEASON_ID", self.metric()]]
+        stats = self.categories[category].get()
 
-            # Get best year, sort by primary metric
-            best = int(
-                stats.sort_values(by=self.metric(), ascending=False)["SEASON_ID"].iloc[
-                    0
-                ]
-            )
-
-            # Get years active, best year, along with metric trends
-            return metrics["SEASON_ID"].tolist(), best, metrics
+        # Warm up remaining categories
+        if not self.warmup:
+            self.warmup = threading.Thread(target=self.warm, daemon=True)
+            self.warmup.start()
 
-        return range(1871, datetime.datetime.today().year), 1950, None
+        return stats
 
-    def search(self, name=None, year=None, row=None, limit=10):
+    def warm(self):
         """
-        Runs an embeddings search. This method takes either a player-year or stats row as input.
-
-        Args:
-            name: player name to search
-            year: year to search
-            row: row of stats to search
-            limit: max results to return
-
-        Returns:
-            list of results
+        Builds all categories not yet built.
         """
 
-        if row:
-            query = self.vector(row)
-        else:
-            # Lookup player key and build vector id
-            name = self.names.get(name)
-            query = f"{year}{name[0] if name else name}"
-            query = self.vectors.get(query)
-
-        results, ids = [], set()
-        if query is not None:
-            for uid, _ in self.embeddings.search(query, limit * 5):
-                # Only add unique players
-                if uid[4:] not in ids:
-                    result = self.data[uid].copy()
-                    result[
-                        "link"
-                    ] = f'https://www.nba.com/stats/player/{result["PLAYER_ID"]}?PerMode=Totals'
-                    results.append(result)
-                    ids.add(uid[4:])
+        for category in self.categories.values():
+            category.get()
 
-                    if len(ids) >= limit:
-                        break
-
-        return results
-
-    def transform(self, row):
+    def progress(self):
         """
-        Transforms a stats row into a vector.
-
-        Args:
-            row: stats row
+        Gets the number of built categories.
 
         Returns:
-            vector
+            ready, total
         """
 
-        if isinstance(row, np.ndarray):
-            return row
-
-        return np.array(
-            [
-                0.0 if pd.isna(row[x]) or np.isnan(row[x]) else row[x]
-                for x in self.columns
-            ]
+        return (
+            sum(category.ready() for category in self.categories.values()),
+            len(self.categories),
         )
 
-
-class Counting(Stats):
-    """
-    Counting Stats
-    """
-
-    def loadcolumns(self):
-        return [
-            "PLAYER_ID",
-            "PLAYER_NAME",
-            "SEASON_ID",
-            "LEAGUE_ID",
-            "TEAM_ID",
-            "TEAM_ABBREVIATION",
-            "PLAYER_AGE",
-            "GP",
-            "GS",
-            "MIN",
-            "FGM",
-            "FGA",
-            "FG_PCT",
-            "FG3M",
-            "FG3A",
-            "FG3_PCT",
-            "FTM",
-            "FTA",
-            "FT_PCT",
-            "OREB",
-            "DREB",
-            "REB",
-            "AST",
-            "STL",
-            "BLK",
-            "TOV",
-            "PF",
-            "PTS",
-        ]
-
-    def load(self):
-        totals = pd.read_csv("../data/total-stats.csv")
-
-        # Require player to have at least 40 Games
-        totals = totals[totals["GP"] >= 40]
-
-        return totals
-
-
-class PerGame(Stats):
-    """
-    Per Game stats.
-    """
-
-    def loadcolumns(self):
-        return [
-            "PLAYER_ID",
-            "PLAYER_NAME",
-            "SEASON_ID",
-            "LEAGUE_ID",
-            "TEAM_ID",
-            "TEAM_ABBREVIATION",
-            "PLAYER_AGE",
-            "GP",
-            "GS",
-            "MIN",
-            "FGM",
-            "FGA",
-            "FG_PCT",
-            "FG3M",
-            "FG3A",
-            "FG3_PCT",
-            "FTM",
-            "FTA",
-            "FT_PCT",
-            "OREB",
-            "DREB",
-            "REB",
-            "AST",
-            "STL",
-            "BLK",
-            "TOV",
-            "PF",
-            "PTS",
-        ]
-
-    def load(self):
-        # Retrieve raw data from GitHub
-        per_game = pd.read_csv("../data/per-game-stats.csv")
-
-        # Require player to have 20 games played
-        per_game = per_game[per_game["GP"] >= 20]
-
-        return per_game
-
-    # def metric(self):
-    #     return "WADJ"
-
-    # def vector(self, row):
-    #     row["WHIP"] = (
-    #         (row["BB"] + row["H"]) / (row["IPouts"] / 3) if row["IPouts"] else None
-    #     )
-    #     row["WADJ"] = (
-    #         (row["W"] + row["SV"]) / (row["ERA"] + row["WHIP"])
-    #         if row["ERA"] and row["WHIP"]
-    #         else None
-    #     )
-
-    #     return self.transform(row)
-
-
-class Application:
-    """
-    Main application.
-    """
-
-    def __init__(self):
-        """
-        Creates a new application.
-        """
-        print("INITIALIZING")
-
-        # Total stats
-        self.total = Counting()
-
-        # Pitching stats
-        self.per_game = PerGame()
-
     def run(self):
         """
         Runs a Streamlit application.
@@ -395,6 +149,13 @@ class Application:
         """
         )
 
+        # Show background warm up progress
+        ready, total = self.progress()
+        if self.warmup and ready < total:
+            st.progress(
+                ready / total, text=f"Loading stat categories ({ready}/{total} ready)"
+            )
+
         player, search = st.tabs(["Player", "Search"])
 
         # Player tab
@@ -419,7 +180,7 @@ class Application:
 
         # Category and stats
         category = self.category(params.get("category"), "category")
-        stats = self.total if category == "Totals" else self.per_game
+        stats = self.stats(category)
 
         # Player name
         name = self.name(stats.names, params.get("name"))
@@ -455,11 +216,15 @@ class Application:
         st.markdown("Find players with similar statistics.")
 
         category = self.category("Totals", "searchcategory")
+
+        # Never wait on a second build, the category is built by the warm up thread
+        if not self.categories[category].ready():
+            st.info(f"Loading {category} stats, they will be ready shortly.")
+            return
+
         with st.form("search"):
-            if category == "Totals":
-                stats, columns = self.total, self.total.columns[7:]
-            elif category == "Per Game":
-                stats, columns = self.per_game, self.per_game.columns[7:]
+            stats = self.stats(category)
+            columns = stats.columns[7:]
 
             # Enter stats with data editor
             inputs = st.data_editor(
@@ -521,7 +286,7 @@ class Application:
         """
 
         # List of stat categories
-        categories = ["Totals", "Per Game"]
+        categories = list(self.categories)
 
         # Get category parameter, default if not available or valid
         default = (
@@ -590,7 +355,7 @@ class Application:
         """
 
         # Key metric
-        metric = self.total.metric() if category == "Totals" else self.per_game.metric()
+        metric = self.stats(category).metric()
 
         # Cast year to string
         metrics["SEASON_ID"] = metrics["SEASON_ID"].astype(str)
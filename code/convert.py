@@ -0,0 +1,96 @@
+"""
+Converts the season totals CSV file in the data folder to a compact, typed Parquet file. Per game and per 36
+stats are derived from the totals, so their CSV files are not converted.
+
+Text columns are stored as categoricals, numeric columns are downcast and an integer SEASON column holds the
+season start year. Dataset.read reads the Parquet file when present and falls back to CSV.
+
+The season totals are also written as a table with one row per player-season and a table of team stints, the
+data files of the Shiny app. They are copied into the Shiny app's data folder.
+
+Install pyarrow and run from the code directory:
+  pip install pyarrow
+  python convert.py
+"""
+
+import argparse
+import os
+import shutil
+
+import pandas as pd
+
+from stats import Dataset
+
+
+def convert(path):
+    """
+    Converts a CSV stats file to Parquet.
+
+    Args:
+        path: path to CSV file
+
+    Returns:
+        path to Parquet file
+    """
+
+    # Read and type CSV directly, never from an existing Parquet copy
+    stats = Dataset.typed(pd.read_csv(path))
+
+    output = f"{os.path.splitext(path)[0]}.parquet"
+    stats.to_parquet(output, index=False, compression="zstd")
+
+    return output
+
+
+def seasons(path):
+    """
+    Writes the player-season and team stints tables of a stats file as Parquet. Traded players' seasons are
+    resolved by Dataset.aggregate, the same rows the Stats index uses.
+
+    Args:
+        path: path to CSV stats file, such as total-stats.csv
+
+    Returns:
+        path to player-season file, path to team stints file
+    """
+
+    dataset = Dataset(Dataset.typed(pd.read_csv(path)))
+
+    # total-stats.csv -> total-seasons.parquet, total-stints.parquet
+    base = os.path.splitext(path)[0].removesuffix("-stats")
+    outputs = f"{base}-seasons.parquet", f"{base}-stints.parquet"
+
+    dataset.seasons("Totals").to_parquet(outputs[0], index=False, compression="zstd")
+    dataset.stints.to_parquet(outputs[1], index=False, compression="zstd")
+
+    return outputs
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert stats CSV files to Parquet")
+    parser.add_argument(
+        "paths",
+        nargs="*",
+        default=["../data/total-stats.csv"],
+        help="CSV files to convert",
+    )
+    parser.add_argument(
+        "--totals", default="../data/total-stats.csv", help="season totals CSV file"
+    )
+    parser.add_argument(
+        "--shiny", default="../shiny-app/data", help="Shiny app data folder"
+    )
+
+    args = parser.parse_args()
+
+    for path in args.paths:
+        output = convert(path)
+        print(
+            f"{path} ({os.path.getsize(path) / 1e6:.1f} MB) -> "
+            f"{output} ({os.path.getsize(output) / 1e6:.1f} MB)"
+        )
+
+    # Shiny app data files
+    for output in seasons(args.totals):
+        shutil.copy2(output, args.shiny)
+        print(f"{args.totals} -> {output} -> {args.shiny}")
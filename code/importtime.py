@@ -0,0 +1,102 @@
+"""
+Import time budget check for the stats core.
+
+Imports a module in fresh interpreters with `python -X importtime`, parses the timings and fails when the
+import exceeds a time budget or pulls in UI or txtai dependencies.
+
+Run from the code directory:
+  python importtime.py --budget 1000
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+
+# Modules the stats core must not import
+FORBIDDEN = ["altair", "streamlit", "txtai", "torch", "transformers"]
+
+
+def measure(module):
+    """
+    Imports a module in a fresh interpreter and parses -X importtime output.
+
+    Args:
+        module: module to import
+
+    Returns:
+        {module name: cumulative import time in microseconds}
+    """
+
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    # Line format: "import time: self [us] | cumulative | imported package"
+    timings = {}
+    for line in process.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, name = line.split("|")
+            if cumulative.strip().isdigit():
+                timings[name.strip()] = int(cumulative)
+
+    return timings
+
+
+def run(module, budget, runs):
+    """
+    Measures a module import multiple times and checks it against the budget.
+
+    Args:
+        module: module to import
+        budget: import time budget in milliseconds
+        runs: number of fresh interpreter runs
+
+    Returns:
+        True if the import is within budget and imports no forbidden modules
+    """
+
+    results = [measure(module) for _ in range(runs)]
+
+    # Median cumulative time of the top level module
+    elapsed = statistics.median(timings.get(module, 0) for timings in results) / 1000
+
+    # Forbidden modules pulled in by the import
+    forbidden = sorted(
+        {
+            name
+            for timings in results
+            for name in timings
+            if name.split(".")[0] in FORBIDDEN
+        }
+    )
+
+    # Slowest imports from the last run
+    slowest = sorted(results[-1].items(), key=lambda x: -x[1])[:10]
+
+    print(f"{module}: {elapsed:.1f} ms (budget {budget} ms, median of {runs} runs)")
+    for name, cumulative in slowest:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+    if forbidden:
+        print(f"FAIL: {module} imports {', '.join(forbidden)}")
+
+    if elapsed > budget:
+        print(f"FAIL: {module} import exceeds budget by {elapsed - budget:.1f} ms")
+
+    return not forbidden and elapsed <= budget
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import time budget check")
+    parser.add_argument("--module", default="stats", help="module to import")
+    parser.add_argument(
+        "--budget", type=float, default=1000, help="import time budget in ms"
+    )
+    parser.add_argument("--runs", type=int, default=5, help="number of runs")
+
+    args = parser.parse_args()
+    sys.exit(0 if run(args.module, args.budget, args.runs) else 1)
@@ -0,0 +1,970 @@
+"""
+Stats ingestion. Fetches career totals for every player from the NBA stats API and writes the stats files in ../data.
+Per game and per 36 stats are derived from the totals with the same rounding as the API, and a sample of players is
+checked against the values the API reports.
+
+Replaces the serial loops in stats-import.ipynb. Requests run on a bounded worker pool behind a token bucket rate
+limiter, failed requests are retried with exponential backoff and progress is logged while running.
+
+Ingestion is incremental. A manifest keeps when each player was last fetched, their last season and a hash of their
+rows, and only new, active and recently active players are fetched again. Fetched players are streamed to an
+append-only checkpoint file in batches, so memory stays bounded and an interrupted run resumes where it stopped, and
+updated rows are merged into the existing files.
+
+Install nba_api to fetch from the NBA stats API:
+  pip install nba_api
+
+Run from the code directory:
+  python ingest.py --rate 1.5 --workers 4
+
+To fetch every player again:
+  python ingest.py --full
+
+To test against a local stand-in for the stats API:
+  python ingest.py --url http://localhost:8000
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import shutil
+import threading
+import time
+import urllib.parse
+import urllib.request
+
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import numpy as np
+import pandas as pd
+
+from stats import Dataset
+
+# Output file for each stats mode
+OUTPUTS = {
+    "Totals": "total-stats.csv",
+    "Per36": "per-36-stats.csv",
+    "PerGame": "per-game-stats.csv",
+}
+
+# Manifest file and checkpoint directory, in the output directory
+MANIFEST = "ingest-manifest.json"
+CHECKPOINT = ".ingest"
+
+
+class TokenBucket:
+    """
+    Token bucket rate limiter shared by all workers. Tokens are added at a fixed rate up to a burst size and
+    each request takes one token.
+    """
+
+    def __init__(self, rate, burst=1):
+        """
+        Creates a new TokenBucket.
+
+        Args:
+            rate: tokens added per second
+            burst: maximum number of tokens
+        """
+
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Takes a token, waiting until one is available.
+        """
+
+        while True:
+            with self.lock:
+                # Add tokens for the time elapsed since the last update
+                now = time.monotonic()
+                self.tokens = min(
+                    self.burst, self.tokens + (now - self.updated) * self.rate
+                )
+                self.updated = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                # Time until the next token
+                delay = (1 - self.tokens) / self.rate
+
+            time.sleep(delay)
+
+
+class Fetcher:
+    """
+    Base stats fetcher. Fetchers get the list of players and each player's career stats.
+    """
+
+    def players(self):
+        """
+        Gets all players.
+
+        Returns:
+            DataFrame with id, full_name and is_active columns
+        """
+
+        raise NotImplementedError
+
+    def career(self, player, mode):
+        """
+        Gets a player's regular season stats, one row per season and team.
+
+        Args:
+            player: player id
+            mode: stats mode (Totals, PerGame or Per36)
+
+        Returns:
+            stats DataFrame
+        """
+
+        raise NotImplementedError
+
+
+class NBAFetcher(Fetcher):
+    """
+    Fetches stats from the NBA stats API with nba_api.
+    """
+
+    def __init__(self, timeout=30):
+        """
+        Creates a new NBAFetcher.
+
+        Args:
+            timeout: request timeout in seconds
+        """
+
+        self.timeout = timeout
+
+    def players(self):
+        from nba_api.stats.static import players
+
+        return pd.DataFrame(players.get_players())[["id", "full_name", "is_active"]]
+
+    def career(self, player, mode):
+        from nba_api.stats.endpoints import playercareerstats
+
+        stats = playercareerstats.PlayerCareerStats(
+            player_id=player, per_mode36=mode, timeout=self.timeout
+        )
+        return stats.get_data_frames()[0]
+
+
+class HTTPFetcher(Fetcher):
+    """
+    Fetches stats from a server that answers like the NBA stats API, for example a local stand-in for testing.
+
+    The server answers GET /players with a JSON list of {"id", "full_name", "is_active"} and GET /playercareerstats with
+    result sets like the NBA stats API.
+    """
+
+    def __init__(self, url, timeout=30):
+        """
+        Creates a new HTTPFetcher.
+
+        Args:
+            url: base url
+            timeout: request timeout in seconds
+        """
+
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+
+    def players(self):
+        players = pd.DataFrame(self.get("players"))
+        if "is_active" not in players:
+            players["is_active"] = False
+
+        return players[["id", "full_name", "is_active"]]
+
+    def career(self, player, mode):
+        data = self.get(
+            "playercareerstats", {"PlayerID": player, "PerMode": mode, "LeagueID": ""}
+        )
+
+        # First result set has the regular season totals
+        result = data["resultSets"][0]
+        return pd.DataFrame(result["rowSet"], columns=result["headers"])
+
+    def get(self, path, params=None):
+        """
+        Runs a GET request and parses the JSON response.
+
+        Args:
+            path: url path
+            params: query parameters
+
+        Returns:
+            parsed JSON
+        """
+
+        url = f"{self.url}/{path}"
+        if params:
+            url += f"?{urllib.parse.urlencode(params)}"
+
+        with urllib.request.urlopen(url, timeout=self.timeout) as response:
+            return json.loads(response.read())
+
+
+class Progress:
+    """
+    Ingestion progress counters, logged periodically.
+    """
+
+    def __init__(self, total, interval=10):
+        """
+        Creates a new Progress.
+
+        Args:
+            total: number of players
+            interval: seconds between log lines
+        """
+
+        self.total = total
+        self.interval = interval
+        self.done, self.errors, self.requests, self.retries, self.rows = 0, 0, 0, 0, 0
+        self.start = time.monotonic()
+        self.logged = self.start
+        self.lock = threading.Lock()
+
+    def update(self, **counts):
+        """
+        Adds to counters and logs progress when the interval has passed.
+
+        Args:
+            counts: counter increments
+        """
+
+        with self.lock:
+            for name, count in counts.items():
+                setattr(self, name, getattr(self, name) + count)
+
+            if time.monotonic() - self.logged >= self.interval:
+                self.logged = time.monotonic()
+                self.log()
+
+    def log(self):
+        """
+        Logs progress as a single line.
+        """
+
+        elapsed = time.monotonic() - self.start
+        rate = self.requests / elapsed if elapsed else 0.0
+        remaining = (self.total - self.done) / (self.done / elapsed) if self.done else 0
+
+        print(
+            f"{self.done}/{self.total} players, {self.rows} rows, {self.errors} errors, "
+            f"{self.retries} retries, {rate:.2f} req/s, {elapsed:.0f}s elapsed, ~{remaining:.0f}s remaining",
+            flush=True,
+        )
+
+
+class Manifest:
+    """
+    Per-player ingestion manifest with when each player was last fetched, the last season seen and a hash of
+    their rows, by stats mode.
+    """
+
+    def __init__(self, path):
+        """
+        Creates a new Manifest, loading it from path if it exists.
+
+        Args:
+            path: path to manifest file
+        """
+
+        self.path = path
+        self.modes = {}
+
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.modes = json.load(f)
+
+    def entries(self, mode):
+        """
+        Gets the manifest entries of a stats mode.
+
+        Args:
+            mode: stats mode
+
+        Returns:
+            {player id: entry}
+        """
+
+        return self.modes.setdefault(mode, {})
+
+    def latest(self, mode):
+        """
+        Gets the latest season seen for any player.
+
+        Args:
+            mode: stats mode
+
+        Returns:
+            season id or None
+        """
+
+        seasons = [x["season"] for x in self.entries(mode).values() if x["season"]]
+        return max(seasons) if seasons else None
+
+    def stale(self, mode, player, active, latest, age=None):
+        """
+        Checks if a player needs to be fetched. New, active and recently active players are fetched, as are
+        players last fetched longer than age ago.
+
+        Args:
+            mode: stats mode
+            player: player id
+            active: True if the player is active
+            latest: latest season seen for any player
+            age: maximum seconds since the last fetch, None to never expire
+
+        Returns:
+            True if the player needs to be fetched
+        """
+
+        entry = self.entries(mode).get(str(player))
+        if not entry or active:
+            return True
+
+        # Played in the latest season, stats can still change
+        if latest and entry["season"] == latest:
+            return True
+
+        return bool(age and time.time() - entry["fetched"] > age)
+
+    def update(self, mode, player, digest, season, fetched=None):
+        """
+        Updates a player's entry.
+
+        Args:
+            mode: stats mode
+            player: player id
+            digest: hash of the player's rows
+            season: last season id, None if the player has no rows
+            fetched: fetch time, defaults to now
+
+        Returns:
+            True if the player's rows changed
+        """
+
+        entries = self.entries(mode)
+        changed = entries.get(str(player), {}).get("hash") != digest
+
+        entries[str(player)] = {
+            "fetched": fetched if fetched else time.time(),
+            "season": season,
+            "hash": digest,
+        }
+
+        return changed
+
+    def bootstrap(self, mode, stats, fetched):
+        """
+        Adds entries for players in an existing stats file that aren't in the manifest yet, so they
+        aren't all fetched again.
+
+        Args:
+            mode: stats mode
+            stats: existing stats DataFrame
+            fetched: time the stats file was written
+        """
+
+        entries = self.entries(mode)
+        for player, rows in stats.groupby("PLAYER_ID", sort=False):
+            if str(player) not in entries:
+                self.update(mode, player, *self.summary(rows), fetched)
+
+    def save(self):
+        """
+        Saves the manifest atomically.
+        """
+
+        temp = f"{self.path}.tmp"
+        with open(temp, "w", encoding="utf-8") as f:
+            json.dump(self.modes, f)
+
+        os.replace(temp, self.path)
+
+    @staticmethod
+    def digest(stats):
+        """
+        Hashes a player's rows.
+
+        Args:
+            stats: player stats DataFrame
+
+        Returns:
+            hex digest
+        """
+
+        columns = sorted(stats.columns)
+        return hashlib.sha256(
+            stats[columns].to_csv(index=False).encode("utf-8")
+        ).hexdigest()
+
+    @staticmethod
+    def summary(stats):
+        """
+        Summarizes a player's rows for the manifest.
+
+        Args:
+            stats: player stats DataFrame
+
+        Returns:
+            (hex digest, last season id or None)
+        """
+
+        season = str(stats["SEASON_ID"].max()) if len(stats) else None
+        return Manifest.digest(stats), season
+
+
+class Sink:
+    """
+    Append-only stats file writer. Player frames are buffered and appended to a CSV file in batches, so memory
+    stays bounded and the file is never rewritten. Writes are thread-safe and the column order of the first
+    batch, with PLAYER_ID and PLAYER_NAME first, is kept for every batch.
+    """
+
+    # Leading columns
+    COLUMNS = ["PLAYER_ID", "PLAYER_NAME"]
+
+    def __init__(self, path, every=2000):
+        """
+        Creates a new Sink. Appends to path if it exists.
+
+        Args:
+            path: path to CSV file
+            every: number of buffered rows that triggers a batch write
+        """
+
+        self.path = path
+        self.every = every
+        self.frames, self.rows = [], 0
+        self.lock = threading.Lock()
+
+        # Continue an existing file with its columns
+        self.columns = None
+        if os.path.exists(path) and os.path.getsize(path):
+            self.columns = list(pd.read_csv(path, nrows=0).columns)
+
+    def write(self, stats):
+        """
+        Adds player stats, writing a batch when the buffer is full.
+
+        Args:
+            stats: stats DataFrame
+        """
+
+        if stats.empty:
+            return
+
+        with self.lock:
+            self.frames.append(stats)
+            self.rows += len(stats)
+
+            if self.rows >= self.every:
+                self.append()
+
+    def flush(self):
+        """
+        Writes all buffered stats.
+        """
+
+        with self.lock:
+            self.append()
+
+    def append(self):
+        """
+        Appends buffered stats to the file. The caller holds the lock.
+        """
+
+        if not self.frames:
+            return
+
+        batch = pd.concat(self.frames, ignore_index=True)
+
+        # Putting the Name column second, then keep the same order for every batch
+        if not self.columns:
+            self.columns = self.COLUMNS + [
+                col for col in batch.columns if col not in self.COLUMNS
+            ]
+
+        header = not os.path.exists(self.path) or not os.path.getsize(self.path)
+        batch.reindex(columns=self.columns).to_csv(
+            self.path, mode="a", header=header, index=False
+        )
+
+        self.frames, self.rows = [], 0
+
+    def read(self, players=None, chunksize=50000):
+        """
+        Reads written stats in chunks.
+
+        Args:
+            players: only read rows of these player ids if set
+            chunksize: rows per chunk
+
+        Returns:
+            stats DataFrame
+        """
+
+        if not os.path.exists(self.path) or not os.path.getsize(self.path):
+            return pd.DataFrame(columns=self.columns if self.columns else self.COLUMNS)
+
+        chunks = []
+        for chunk in pd.read_csv(
+            self.path, dtype={"LEAGUE_ID": str}, chunksize=chunksize
+        ):
+            chunks.append(chunk[chunk["PLAYER_ID"].isin(players)] if players else chunk)
+
+        return pd.concat(chunks, ignore_index=True)
+
+
+class Checkpoint:
+    """
+    Fetched player stats streamed to disk, so an interrupted ingestion resumes where it stopped. Stats are
+    appended with a Sink and the checkpoint state records the players and file size covered by each batch.
+    """
+
+    def __init__(self, directory, every=100):
+        """
+        Creates a new Checkpoint.
+
+        Args:
+            directory: checkpoint directory
+            every: number of players per batch
+        """
+
+        self.directory = directory
+        self.every = every
+        self.pending = {}
+
+        os.makedirs(directory, exist_ok=True)
+
+        # Drop rows written after the last saved batch
+        state = self.state()
+        path = os.path.join(directory, "stats.csv")
+        if os.path.exists(path) and os.path.getsize(path) > state["size"]:
+            os.truncate(path, state["size"])
+
+        self.sink = Sink(path)
+        self.players = state["players"]
+
+    def add(self, player, stats):
+        """
+        Adds a fetched player, saving a batch when it is full.
+
+        Args:
+            player: player id
+            stats: player stats DataFrame
+        """
+
+        self.sink.write(stats)
+        self.pending[str(player)] = Manifest.summary(stats)
+
+        if len(self.pending) >= self.every:
+            self.flush()
+
+    def flush(self):
+        """
+        Writes buffered players and saves checkpoint state.
+        """
+
+        if not self.pending:
+            return
+
+        self.sink.flush()
+        self.players.update(self.pending)
+
+        # Players without rows may leave the stats file unwritten
+        size = os.path.getsize(self.sink.path) if os.path.exists(self.sink.path) else 0
+        state = {"size": size, "players": self.players}
+
+        # Replace state atomically, a batch only counts once its state is saved
+        path = os.path.join(self.directory, "checkpoint.json")
+        with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(state, f)
+
+        os.replace(f"{path}.tmp", path)
+
+        self.pending = {}
+
+    def state(self):
+        """
+        Reads checkpoint state.
+
+        Returns:
+            {"size": bytes of stats covered, "players": {player id: (hex digest, last season id)}}
+        """
+
+        path = os.path.join(self.directory, "checkpoint.json")
+        if not os.path.exists(path):
+            return {"size": 0, "players": {}}
+
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def clear(self):
+        """
+        Deletes the checkpoint.
+        """
+
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+class Ingestion:
+    """
+    Runs player requests on a bounded worker pool behind a shared rate limiter.
+    """
+
+    def __init__(self, fetcher, workers=4, rate=1.5, burst=1, retries=3, backoff=2.0):
+        """
+        Creates a new Ingestion.
+
+        Args:
+            fetcher: Fetcher
+            workers: number of concurrent requests
+            rate: maximum requests per second
+            burst: maximum requests sent at once after an idle period
+            retries: number of retries for a failed request
+            backoff: initial retry delay in seconds, doubled after every failure
+        """
+
+        self.fetcher = fetcher
+        self.workers = workers
+        self.bucket = TokenBucket(rate, burst)
+        self.retries = retries
+        self.backoff = backoff
+
+    def fetch(self, player, mode, progress):
+        """
+        Fetches a player's stats, retrying failed requests with exponential backoff and jitter.
+
+        Args:
+            player: player id
+            mode: stats mode
+            progress: Progress
+
+        Returns:
+            stats DataFrame
+        """
+
+        for attempt in range(self.retries + 1):
+            self.bucket.acquire()
+            progress.update(requests=1)
+
+            try:
+                return self.fetcher.career(player, mode)
+            except Exception:
+                if attempt == self.retries:
+                    raise
+
+                progress.update(retries=1)
+                time.sleep(self.backoff * 2**attempt * random.uniform(0.5, 1.5))
+
+    def run(self, players, mode, checkpoint):
+        """
+        Fetches stats for a list of players and streams them to a checkpoint.
+
+        Args:
+            players: DataFrame with id and full_name columns
+            mode: stats mode
+            checkpoint: Checkpoint to resume from and write to
+
+        Returns:
+            list of player ids that failed
+        """
+
+        progress = Progress(len(players))
+        errors = []
+
+        # Resume from checkpoint, skipping players already fetched
+        players = players[~players["id"].astype(str).isin(checkpoint.players)]
+        progress.update(done=len(checkpoint.players))
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            pending = {}
+            for player, name in zip(players["id"], players["full_name"]):
+                # Keep a bounded number of requests queued
+                while len(pending) >= self.workers * 2:
+                    self.collect(pending, errors, progress, checkpoint)
+
+                future = executor.submit(self.fetch, player, mode, progress)
+                pending[future] = (player, name)
+
+            while pending:
+                self.collect(pending, errors, progress, checkpoint)
+
+        checkpoint.flush()
+        progress.log()
+
+        return errors
+
+    def collect(self, pending, errors, progress, checkpoint):
+        """
+        Waits for at least one pending request and writes its results to the checkpoint.
+
+        Args:
+            pending: {future: (player id, player name)}
+            errors: list of failed player ids to add to
+            progress: Progress
+            checkpoint: Checkpoint
+        """
+
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            player, name = pending.pop(future)
+            try:
+                stats = future.result()
+            except Exception as e:
+                print(f"Error processing player {player}: {str(e)}")
+                errors.append(player)
+                progress.update(done=1, errors=1)
+                continue
+
+            # Add name to stats
+            stats["PLAYER_NAME"] = name
+            checkpoint.add(player, stats)
+            progress.update(done=1, rows=len(stats))
+
+    def refresh(self, players, mode, directory, manifest, full=False, age=None):
+        """
+        Incrementally refreshes a stats file. Fetches the players that are new, active or recently active,
+        merges their rows into the existing file and updates the manifest.
+
+        Args:
+            players: DataFrame with id, full_name and is_active columns
+            mode: stats mode
+            directory: output directory
+            manifest: Manifest
+            full: fetch all players if True
+            age: maximum seconds since a player was last fetched, None to never expire
+
+        Returns:
+            (number of players fetched, number of players changed, list of player ids that failed)
+        """
+
+        path = os.path.join(directory, OUTPUTS[mode])
+        order = players["id"]
+
+        # Existing stats, players already in the file start in the manifest
+        existing = pd.DataFrame()
+        if os.path.exists(path):
+            existing = pd.read_csv(path, dtype={"LEAGUE_ID": str})
+            manifest.bootstrap(mode, existing, os.path.getmtime(path))
+
+        # Players to fetch
+        latest = manifest.latest(mode)
+        stale = [
+            full or manifest.stale(mode, player, active, latest, age)
+            for player, active in zip(players["id"], players["is_active"])
+        ]
+        players = players[stale]
+
+        print(f"Fetching {mode} stats for {len(players)} players")
+
+        checkpoint = Checkpoint(os.path.join(directory, CHECKPOINT, mode))
+        errors = self.run(players, mode, checkpoint)
+
+        # Update the manifest, only players whose rows changed are merged
+        changed = [
+            int(player)
+            for player, (digest, season) in checkpoint.players.items()
+            if manifest.update(mode, player, digest, season)
+        ]
+
+        if changed:
+            merged = self.merge(existing, checkpoint.sink.read(changed), changed, order)
+
+            # Replace the file atomically
+            merged.to_csv(f"{path}.tmp", index=False)
+            os.replace(f"{path}.tmp", path)
+
+        manifest.save()
+        checkpoint.clear()
+
+        return len(checkpoint.players), len(changed), errors
+
+    def derive(self, directory, modes):
+        """
+        Derives rate stats files from the totals file, so they are never fetched.
+
+        Args:
+            directory: output directory
+            modes: rate stats modes to write
+
+        Returns:
+            {mode: derived stats DataFrame}
+        """
+
+        totals = pd.read_csv(
+            os.path.join(directory, OUTPUTS["Totals"]), dtype={"LEAGUE_ID": str}
+        )
+        dataset = Dataset(totals)
+
+        views = {}
+        for mode in modes:
+            views[mode] = dataset.derive(mode)
+
+            # Replace the file atomically
+            path = os.path.join(directory, OUTPUTS[mode])
+            views[mode].to_csv(f"{path}.tmp", index=False)
+            os.replace(f"{path}.tmp", path)
+
+        return views
+
+    def validate(self, stats, mode, sample, tolerance=0.1):
+        """
+        Checks derived stats for a random sample of players against the values the stats API reports.
+
+        Args:
+            stats: derived stats DataFrame
+            mode: stats mode
+            sample: number of players to check
+            tolerance: largest allowed difference, the API rounds from unrounded minutes
+
+        Returns:
+            list of player ids whose derived stats don't match
+        """
+
+        players = pd.Series(pd.unique(stats["PLAYER_ID"]))
+        players = players.sample(min(sample, len(players))).tolist()
+
+        columns = Dataset.RATES + (["MIN"] if mode == "PerGame" else [])
+        progress = Progress(len(players))
+        mismatches = []
+
+        for player in players:
+            try:
+                expected = self.fetch(player, mode, progress)
+            except Exception as e:
+                print(f"Error validating player {player}: {str(e)}")
+                continue
+
+            # Line up seasons and teams, every row needs a match
+            merged = stats[stats["PLAYER_ID"] == player].merge(
+                expected,
+                on=["SEASON_ID", "TEAM_ID"],
+                how="outer",
+                suffixes=("", "_API"),
+                indicator=True,
+            )
+            matched = (merged["_merge"] == "both").all() and np.allclose(
+                merged[columns].to_numpy(dtype=float),
+                merged[[f"{col}_API" for col in columns]].to_numpy(dtype=float),
+                rtol=0,
+                atol=tolerance + 1e-6,
+                equal_nan=True,
+            )
+
+            if not matched:
+                mismatches.append(player)
+
+            progress.update(done=1)
+
+        return mismatches
+
+    def merge(self, existing, stats, players, order):
+        """
+        Replaces players' rows in an existing stats DataFrame. Players keep their position, new players are
+        added at the end.
+
+        Args:
+            existing: existing stats DataFrame
+            stats: fetched stats DataFrame
+            players: ids of players to replace
+            order: all player ids in API order, new players are added in this order
+
+        Returns:
+            merged stats DataFrame
+        """
+
+        if existing.empty:
+            existing = stats.head(0)
+
+        merged = pd.concat(
+            [
+                existing[~existing["PLAYER_ID"].isin(players)],
+                stats[stats["PLAYER_ID"].isin(players)],
+            ],
+            ignore_index=True,
+        )
+
+        # Order players by first appearance in the existing file, then in the API
+        order = pd.unique(
+            pd.concat([existing["PLAYER_ID"], pd.Series(order), stats["PLAYER_ID"]])
+        )
+        rank = pd.Series(np.arange(len(order)), index=order)
+
+        return merged.iloc[
+            np.argsort(rank[merged["PLAYER_ID"]].to_numpy(), kind="stable")
+        ][existing.columns]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stats ingestion")
+    parser.add_argument("--output", default="../data", help="output directory")
+    parser.add_argument("--url", help="base url of a stand-in stats API")
+    parser.add_argument("--workers", type=int, default=4, help="concurrent requests")
+    parser.add_argument("--rate", type=float, default=1.5, help="requests per second")
+    parser.add_argument("--burst", type=int, default=1, help="request burst size")
+    parser.add_argument("--retries", type=int, default=3, help="retries per request")
+    parser.add_argument("--backoff", type=float, default=2.0, help="retry delay (s)")
+    parser.add_argument("--limit", type=int, help="only fetch the first n players")
+    parser.add_argument("--full", action="store_true", help="fetch all players")
+    parser.add_argument(
+        "--max-age", type=float, help="days before a player is fetched again"
+    )
+    parser.add_argument(
+        "--validate",
+        type=int,
+        default=10,
+        help="players to check against the API per derived file, 0 to skip",
+    )
+
+    args = parser.parse_args()
+
+    # Stats API
+    fetcher = HTTPFetcher(args.url) if args.url else NBAFetcher()
+    ingestion = Ingestion(
+        fetcher, args.workers, args.rate, args.burst, args.retries, args.backoff
+    )
+
+    # Collecting a list of all players and IDs
+    players = fetcher.players()
+    if args.limit:
+        players = players.head(args.limit)
+
+    manifest = Manifest(os.path.join(args.output, MANIFEST))
+    age = args.max_age * 24 * 60 * 60 if args.max_age else None
+
+    # Only totals are fetched
+    fetched, changed, errors = ingestion.refresh(
+        players, "Totals", args.output, manifest, args.full, age
+    )
+
+    print(f"Totals: {fetched} players fetched, {changed} changed")
+    if errors:
+        print(f"{len(errors)} players failed: {errors}")
+
+    # Per game and per 36 stats are derived from totals
+    modes = [mode for mode in OUTPUTS if mode != "Totals"]
+    for mode, stats in ingestion.derive(args.output, modes).items():
+        print(f"{mode}: derived {len(stats)} rows from totals")
+
+        if args.validate:
+            mismatches = ingestion.validate(stats, mode, args.validate)
+            print(
+                f"{mode}: {len(mismatches)} of {args.validate} sampled players differ from the API"
+            )
+            if mismatches:
+                print(f"Players that differ: {mismatches}")
@@ -0,0 +1,1165 @@
+"""
+Stats data and search core. Loads stats, builds feature matrices and player indexes and runs vector searches.
+
+This module only depends on NumPy and pandas. txtai is imported when the txtai search backend is used.
+"""
+
+import datetime
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+
+class Dataset:
+    """
+    Shared base stats table. Totals are read once per process and rate views (per game, per 36 minutes) are
+    derived from them with vectorized division, so all categories share the same id, name and season columns.
+    """
+
+    # Counting stats converted to rates, all other columns are shared as is
+    RATES = [
+        "FGM",
+        "FGA",
+        "FG3M",
+        "FG3A",
+        "FTM",
+        "FTA",
+        "OREB",
+        "DREB",
+        "REB",
+        "AST",
+        "STL",
+        "BLK",
+        "TOV",
+        "PF",
+        "PTS",
+    ]
+
+    # Datasets by source path
+    datasets = {}
+    lock = threading.Lock()
+
+    @classmethod
+    def get(cls, path):
+        """
+        Gets the shared dataset for a totals file, reading it on first use.
+
+        Args:
+            path: path to totals file
+
+        Returns:
+            Dataset
+        """
+
+        with cls.lock:
+            if path not in cls.datasets:
+                cls.datasets[path] = cls(cls.read(path))
+
+        return cls.datasets[path]
+
+    @staticmethod
+    def read(path):
+        """
+        Reads a stats file. A Parquet copy written by convert.py is preferred when it is at least as new
+        as the CSV file, otherwise the CSV file is read and typed the same way.
+
+        Args:
+            path: path to CSV stats file
+
+        Returns:
+            stats DataFrame
+        """
+
+        parquet = f"{os.path.splitext(path)[0]}.parquet"
+        if os.path.exists(parquet) and (
+            not os.path.exists(path)
+            or os.path.getmtime(parquet) >= os.path.getmtime(path)
+        ):
+            try:
+                return pd.read_parquet(parquet)
+            except ImportError:
+                # Parquet engine not installed, fall back to CSV
+                pass
+
+        return Dataset.typed(pd.read_csv(path))
+
+    @staticmethod
+    def typed(stats):
+        """
+        Applies compact column types. Text columns are categorical, numeric columns are downcast to the
+        smallest type that holds them and an integer SEASON column holds the season start year.
+
+        Args:
+            stats: raw stats DataFrame
+
+        Returns:
+            typed stats DataFrame
+        """
+
+        stats = stats.copy()
+
+        # Season start year, 1990-91 is 1990
+        stats["SEASON"] = stats["SEASON_ID"].str[:4].astype("int16")
+
+        for column in stats.columns:
+            if column in ("PLAYER_NAME", "SEASON_ID", "TEAM_ABBREVIATION"):
+                stats[column] = stats[column].astype("category")
+            elif pd.api.types.is_integer_dtype(stats[column]):
+                stats[column] = pd.to_numeric(stats[column], downcast="integer")
+            elif pd.api.types.is_float_dtype(stats[column]):
+                stats[column] = pd.to_numeric(stats[column], downcast="float")
+
+        return stats
+
+    def __init__(self, totals):
+        """
+        Creates a new Dataset.
+
+        Args:
+            totals: season totals DataFrame
+        """
+
+        self.totals = totals
+        self.views = {"Totals": totals}
+        self.lock = threading.Lock()
+
+        # Canonical player-season rows and team stints, shared by all views
+        self.canonical, self.teams, self.stints = self.aggregate(totals)
+
+    @staticmethod
+    def aggregate(stats):
+        """
+        Resolves player-seasons. Players traded during a season have a row per team plus a TOT row. Each
+        player-season keeps one canonical row, the TOT row for traded players, and team rows are kept in
+        a side table of team stints.
+
+        Args:
+            stats: stats DataFrame
+
+        Returns:
+            canonical row positions, team labels of canonical rows (MIL/CIN for traded players), stints DataFrame
+        """
+
+        keys = ["PLAYER_ID", "SEASON_ID"]
+        team = stats["TEAM_ABBREVIATION"].astype(str).to_numpy() != "TOT"
+
+        # Team stints, one row per player, season and team
+        stints = stats.loc[
+            team, keys + ["TEAM_ID", "TEAM_ABBREVIATION", "GP"]
+        ].reset_index(drop=True)
+
+        # Keep the TOT row of traded seasons, or the first row of a season without one
+        total = (
+            pd.Series(~team, index=stats.index)
+            .groupby([stats[key] for key in keys], sort=False, observed=True)
+            .transform("any")
+            .to_numpy()
+        )
+        canonical = np.flatnonzero(
+            np.where(total, ~team, ~stats.duplicated(keys).to_numpy())
+        )
+
+        # Label traded seasons with their teams in stint order
+        traded = stints[
+            stints.duplicated(keys, keep=False) & stints["TEAM_ABBREVIATION"].notna()
+        ]
+        labels = (
+            traded["TEAM_ABBREVIATION"]
+            .astype(object)
+            .groupby([traded[key] for key in keys], sort=False, observed=True)
+            .agg("/".join)
+            .rename("LABEL")
+            .reset_index()
+        )
+        rows = stats.iloc[canonical]
+        labels = rows[keys].merge(labels, on=keys, how="left")["LABEL"].to_numpy()
+        teams = np.where(
+            pd.isna(labels), rows["TEAM_ABBREVIATION"].astype(object), labels
+        )
+
+        return canonical, teams, stints
+
+    def seasons(self, mode):
+        """
+        Gets a stats view with one row per player-season. Traded players' TOT rows are labeled with their teams.
+
+        Args:
+            mode: Totals, PerGame or Per36
+
+        Returns:
+            stats DataFrame
+        """
+
+        key = f"{mode}Seasons"
+        view = self.view(mode)
+
+        with self.lock:
+            if key not in self.views:
+                seasons = view.iloc[self.canonical].reset_index(drop=True)
+                seasons["TEAM_ABBREVIATION"] = pd.Categorical(self.teams)
+                self.views[key] = seasons
+
+        return self.views[key]
+
+    def view(self, mode):
+        """
+        Gets a stats view, deriving it from totals on first use.
+
+        Args:
+            mode: Totals, PerGame or Per36
+
+        Returns:
+            stats DataFrame
+        """
+
+        with self.lock:
+            if mode not in self.views:
+                self.views[mode] = self.derive(mode)
+
+        return self.views[mode]
+
+    def derive(self, mode):
+        """
+        Derives a rate view from totals. Rates are rounded to 1 decimal, the same as the NBA stats API.
+
+        Args:
+            mode: PerGame or Per36
+
+        Returns:
+            stats DataFrame
+        """
+
+        totals = self.totals
+        if mode == "PerGame":
+            # Minutes are also reported per game
+            columns = self.RATES + ["MIN"]
+            divisor = totals["GP"].to_numpy(dtype=float)
+            scale = 1.0
+        elif mode == "Per36":
+            # Minutes stay as season totals
+            columns = self.RATES
+            divisor = totals["MIN"].to_numpy(dtype=float)
+            scale = 36.0
+        else:
+            raise ValueError(f"Unknown stats mode: {mode}")
+
+        # Divide all rate columns at once, no minutes or games played gives missing values
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rates = np.round(
+                totals[columns].to_numpy(dtype=float)
+                * scale
+                / np.where(divisor > 0, divisor, np.nan).reshape(-1, 1),
+                1,
+            )
+
+        # Shallow copy shares all other columns with totals
+        view = totals.copy(deep=False)
+        view[columns] = rates
+
+        return view
+
+
+class Backend:
+    """
+    Base search backend. Indexes a feature matrix and runs vector similarity queries against it.
+    """
+
+    def index(self, ids, vectors, norms=None):
+        """
+        Builds an index over a feature matrix.
+
+        Args:
+            ids: row ids
+            vectors: feature matrix, one row per id
+            norms: optional precomputed row norms
+        """
+
+        raise NotImplementedError
+
+    def search(self, query, limit):
+        """
+        Finds the closest rows to a query vector.
+
+        Args:
+            query: query vector
+            limit: max results to return
+
+        Returns:
+            list of (id, score) sorted by score descending
+        """
+
+        raise NotImplementedError
+
+    def batch(self, queries, limit):
+        """
+        Finds the closest rows for each query vector in a batch.
+
+        Args:
+            queries: query matrix, one row per query
+            limit: max results to return per query
+
+        Returns:
+            list of (id, score) lists, one per query
+        """
+
+        return [self.search(query, limit) for query in queries]
+
+    def save(self, path):
+        """
+        Saves the index to a directory.
+
+        Args:
+            path: output directory
+        """
+
+        raise NotImplementedError
+
+    def load(self, path):
+        """
+        Loads an index from a directory.
+
+        Args:
+            path: input directory
+        """
+
+        raise NotImplementedError
+
+
+class NumPyBackend(Backend):
+    """
+    Exact cosine similarity search with NumPy. Scores all rows with a single matrix-vector product.
+    """
+
+    def index(self, ids, vectors, norms=None):
+        self.ids = np.asarray(ids)
+
+        # Precompute normalized matrix, all zero rows stay zero
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1) if norms is None else norms
+        self.vectors = np.ascontiguousarray(
+            vectors / np.maximum(norms, 1e-12).reshape(-1, 1)
+        )
+
+    def search(self, query, limit):
+        return self.batch(np.asarray(query).reshape(1, -1), limit)[0]
+
+    def batch(self, queries, limit):
+        queries = np.asarray(queries, dtype=np.float32)
+        queries = queries / np.maximum(
+            np.linalg.norm(queries, axis=1, keepdims=True), 1e-12
+        )
+
+        # Score all rows for all queries with a single matrix-matrix product
+        scores = queries @ self.vectors.T
+
+        # Select top n per query without a full sort, then order the top n
+        limit = min(limit, scores.shape[1])
+        if not limit:
+            return [[] for _ in queries]
+
+        top = np.argpartition(scores, -limit, axis=1)[:, -limit:]
+        top = np.take_along_axis(
+            top, np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1), axis=1
+        )
+
+        return [
+            [(self.ids[x], float(scores[y, x])) for x in row]
+            for y, row in enumerate(top)
+        ]
+
+    def save(self, path):
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, "ids.npy"), self.ids)
+        np.save(os.path.join(path, "vectors.npy"), self.vectors)
+
+    def load(self, path):
+        self.ids = np.load(os.path.join(path, "ids.npy"))
+        self.vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r")
+
+
+class TxtaiBackend(Backend):
+    """
+    Approximate nearest neighbor search with a txtai embeddings index. txtai is only imported when this
+    backend is used.
+    """
+
+    def index(self, ids, vectors, norms=None):
+        from txtai.embeddings import Embeddings
+
+        self.embeddings = Embeddings({"transform": self.transform})
+        self.embeddings.index((uid, vectors[x], None) for x, uid in enumerate(ids))
+
+    def search(self, query, limit):
+        return self.embeddings.search(query, limit)
+
+    def batch(self, queries, limit):
+        return self.embeddings.batchsearch(list(queries), limit)
+
+    def save(self, path):
+        self.embeddings.save(path)
+
+    def load(self, path):
+        from txtai.embeddings import Embeddings
+
+        self.embeddings = Embeddings({"transform": self.transform})
+        self.embeddings.load(path)
+
+    def transform(self, inputs):
+        """
+        Input vectors are already built, pass them through.
+
+        Args:
+            inputs: input vector
+
+        Returns:
+            vector
+        """
+
+        return np.asarray(inputs, dtype=np.float32)
+
+
+class Stats:
+    """
+    Base stats class. Contains methods for loading, indexing and searching stats.
+    """
+
+    # Cache format version, bump whenever the cached artifacts change layout or contents
+    # 2: player index in the pickle, 3: SEASON column, 4: one row per player-season
+    CACHE_VERSION = 4
+
+    def __init__(self, cache=None, backend="numpy", weights=None):
+        """
+        Creates a new Stats instance.
+
+        Args:
+            cache: optional cache directory, built artifacts are reused while the source data is unchanged
+            backend: search backend, "numpy" (exact) or "txtai"
+            weights: optional {column: weight} overrides for the similarity space
+        """
+
+        # Load columns
+        self.columns = self.loadcolumns()
+
+        # Cache entry for the current source data
+        path = os.path.join(cache, self.fingerprint()) if cache else None
+
+        if path and os.path.exists(path):
+            # Restore stats, names and feature matrix
+            self.restore(path)
+        else:
+            # Load stats data
+            self.stats = self.load()
+
+            # Load player index and names
+            self.players = self.loadplayers()
+            self.names = self.loadnames()
+
+            # Build feature matrix
+            self.ids, self.vectors = self.matrix()
+
+            # Save artifacts
+            if path:
+                self.save(path)
+
+        # Fit similarity space
+        self.space, self.norms = self.fit(weights)
+
+        # Build index, cached per backend and weights
+        self.data, self.engine = self.index(
+            backend, os.path.join(path, self.spacekey(backend)) if path else None
+        )
+
+    def loadcolumns(self):
+        """
+        Returns a list of data columns.
+
+        Returns:
+            list of columns
+        """
+
+        columns = self.columns
+        return columns
+
+        raise NotImplementedError
+
+    def features(self):
+        """
+        Returns a list of numeric columns used to build vectors. Text columns are explicitly excluded.
+
+        Returns:
+            list of feature columns
+        """
+
+        return [
+            x
+            for x in self.columns
+            if x not in ["PLAYER_NAME", "SEASON_ID", "TEAM_ABBREVIATION"]
+        ]
+
+    def source(self):
+        """
+        Path to the season totals file. All categories derive their stats from it.
+
+        Returns:
+            path
+        """
+
+        return "../data/total-stats.csv"
+
+    def mode(self):
+        """
+        Stats mode, matches the NBA stats PerMode parameter.
+
+        Returns:
+            Totals, PerGame or Per36
+        """
+
+        raise NotImplementedError
+
+    def games(self):
+        """
+        Minimum number of games played for a player-season to be included.
+
+        Returns:
+            minimum games played
+        """
+
+        raise NotImplementedError
+
+    def weights(self):
+        """
+        Default per-column weights for the similarity space. Columns not listed have a weight of 1.
+        Identifier columns are numeric but meaningless for similarity, so they are weighted 0.
+
+        Returns:
+            {column: weight}
+        """
+
+        return {"PLAYER_ID": 0.0, "LEAGUE_ID": 0.0, "TEAM_ID": 0.0}
+
+    def load(self):
+        """
+        Loads and returns raw stats.
+
+        Returns:
+            stats
+        """
+
+        # One row per player-season, traded players have a single row
+        stats = Dataset.get(self.source()).seasons(self.mode())
+
+        # Require player to have a minimum number of games
+        stats = stats[stats["GP"] >= self.games()]
+
+        # Sort by player so each player's seasons are a contiguous row range
+        return stats.sort_values(by="PLAYER_ID", kind="stable").reset_index(drop=True)
+
+    def fingerprint(self):
+        """
+        Builds a cache key from the cache format version, source data contents, stats mode, columns and
+        games played filter.
+
+        Returns:
+            cache key
+        """
+
+        digest = hashlib.sha256()
+
+        # Hash source data contents
+        with open(self.source(), "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+
+        # Hash cache format version, stats mode, columns and games played filter
+        digest.update(
+            json.dumps(
+                [self.CACHE_VERSION, self.mode(), self.columns, self.games()]
+            ).encode("utf-8")
+        )
+
+        return f"{self.__class__.__name__.lower()}-{digest.hexdigest()[:16]}"
+
+    def save(self, path):
+        """
+        Saves built stats artifacts to a cache directory. Search indexes are saved per backend in subdirectories.
+
+        Args:
+            path: cache entry directory
+        """
+
+        # Write to a temporary directory first so an interrupted save never leaves a partial entry
+        staging = f"{path}.{os.getpid()}.tmp"
+        os.makedirs(staging, exist_ok=True)
+
+        np.save(os.path.join(staging, "ids.npy"), self.ids)
+        np.save(os.path.join(staging, "vectors.npy"), self.vectors)
+
+        with open(os.path.join(staging, "stats.pkl"), "wb") as f:
+            pickle.dump(
+                (self.stats, self.players, self.names),
+                f,
+                protocol=pickle.HIGHEST_PROTOCOL,
+            )
+
+        try:
+            os.replace(staging, path)
+        except OSError:
+            # Another process saved the same entry first
+            shutil.rmtree(staging, ignore_errors=True)
+
+    def restore(self, path):
+        """
+        Restores built artifacts from a cache directory. The feature matrix is memory-mapped.
+
+        Args:
+            path: cache entry directory
+        """
+
+        self.ids = np.load(os.path.join(path, "ids.npy"))
+        self.vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r")
+
+        with open(os.path.join(path, "stats.pkl"), "rb") as f:
+            self.stats, self.players, self.names = pickle.load(f)
+
+    def metric(self):
+        """
+        Primary metric column.
+
+        Returns:
+            metric column name
+        """
+        return "PTS"
+        raise NotImplementedError
+
+    def vector(self, row):
+        """
+        Build a vector for input row.
+
+        Args:
+            row: input row
+
+        Returns:
+            row vector
+        """
+
+        return self.transform(row)
+
+    def loadplayers(self):
+        """
+        Builds a player index in a single group by pass. Each player has a name key, player id, number of
+        seasons, sampling weight, a contiguous row range into the player-sorted stats and best season by
+        the primary metric.
+
+        Returns:
+            players DataFrame indexed by name key
+        """
+
+        metric = self.metric()
+        groups = self.stats.groupby("PLAYER_ID", sort=True)
+
+        # Seasons and row ranges, stats rows are sorted by player
+        players = groups["PLAYER_NAME"].first().astype(str).to_frame()
+        players["seasons"] = groups.size()
+        players["end"] = players["seasons"].cumsum()
+        players["start"] = players["end"] - players["seasons"]
+
+        # Best season by primary metric, missing values rank last
+        values = self.stats[metric].fillna(-np.inf).groupby(self.stats["PLAYER_ID"])
+        players["peak"] = values.max()
+        players["best"] = self.stats["SEASON"].to_numpy()[values.idxmax().to_numpy()]
+
+        # Order players by peak metric, top players are first
+        players = players.reset_index().sort_values(
+            by="peak", ascending=False, kind="stable"
+        )
+
+        # Name key, players sharing a name are keyed with their player id
+        players.index = players["PLAYER_NAME"].where(
+            ~players["PLAYER_NAME"].duplicated(),
+            players["PLAYER_NAME"] + " (" + players["PLAYER_ID"].astype(str) + ")",
+        )
+
+        # Scale scores of top n players, weight = num seasons ^ exponent
+        top = np.arange(len(players), 0, -1) / len(players) >= 0.95
+        players["weight"] = np.power(
+            players["seasons"].to_numpy(dtype=float), np.where(top, 2, 1)
+        )
+
+        return players[["PLAYER_ID", "seasons", "weight", "start", "end", "best"]]
+
+    def loadnames(self):
+        """
+        Loads a name - player id dictionary from the player index.
+
+        Returns:
+            {player name: (player id, weight)}
+        """
+
+        return dict(
+            zip(
+                self.players.index,
+                zip(
+                    self.players["PLAYER_ID"].tolist(), self.players["weight"].tolist()
+                ),
+            )
+        )
+
+    def matrix(self):
+        """
+        Builds a feature matrix for all stats rows in a single vectorized pass. Row ids are built from
+        the season start year and player id.
+
+        Returns:
+            ids, vectors
+        """
+
+        # Build row ids, season start year + player id
+        ids = (
+            self.stats["SEASON"].astype(str) + self.stats["PLAYER_ID"].astype(str)
+        ).to_numpy(dtype=str)
+
+        # Build contiguous float matrix, missing values are 0
+        vectors = np.ascontiguousarray(
+            self.stats[self.features()].to_numpy(dtype=np.float32, na_value=0.0)
+        )
+
+        return ids, vectors
+
+    def fit(self, weights=None):
+        """
+        Fits the similarity space. Each feature column is centered, scaled to unit variance and multiplied
+        by its weight. Centering and scaling are fit once, weights can be changed later with reweight.
+
+        Args:
+            weights: optional {column: weight} overrides
+
+        Returns:
+            space, norms
+        """
+
+        vectors = np.asarray(self.vectors, dtype=np.float32)
+
+        # Per-column centering and scaling, constant columns are left unscaled
+        self.center = vectors.mean(axis=0)
+        self.scale = vectors.std(axis=0)
+        self.scale[self.scale == 0] = 1.0
+
+        # Standardized matrix
+        self.standard = (vectors - self.center) / self.scale
+
+        # Apply weights
+        self.weight = self.loadweights(weights)
+        space = self.standard * self.weight
+
+        return space, np.linalg.norm(space, axis=1)
+
+    def loadweights(self, weights=None):
+        """
+        Builds a weight vector aligned with the feature columns.
+
+        Args:
+            weights: optional {column: weight} overrides
+
+        Returns:
+            weight vector
+        """
+
+        weights = {**self.weights(), **(weights if weights else {})}
+        return np.array(
+            [weights.get(x, 1.0) for x in self.features()], dtype=np.float32
+        )
+
+    def reweight(self, weights):
+        """
+        Updates per-column weights. Only the changed columns of the similarity space and the row norms are
+        re-derived, then the search index is rebuilt from the updated space.
+
+        Args:
+            weights: {column: weight} overrides
+        """
+
+        weight = self.loadweights(weights)
+        changed = np.flatnonzero(weight != self.weight)
+
+        if len(changed):
+            # Update changed columns and squared row norms
+            columns = self.standard[:, changed]
+            squares = self.norms.astype(np.float64) ** 2
+            squares += (columns**2) @ (
+                weight[changed].astype(np.float64) ** 2
+                - self.weight[changed].astype(np.float64) ** 2
+            )
+
+            self.space[:, changed] = columns * weight[changed]
+            self.norms = np.sqrt(np.maximum(squares, 0)).astype(np.float32)
+            self.weight = weight
+
+            # Rebuild search index
+            self.engine.index(self.ids, self.space, self.norms)
+
+    def project(self, vectors):
+        """
+        Projects raw feature vectors into the similarity space. Missing values are filled with the column
+        mean, so they are 0 in the similarity space and don't pull results towards any value.
+
+        Args:
+            vectors: raw vector or matrix
+
+        Returns:
+            projected vector or matrix
+        """
+
+        vectors = np.asarray(vectors, dtype=np.float32)
+        vectors = np.where(np.isnan(vectors), self.center, vectors)
+
+        return (vectors - self.center) / self.scale * self.weight
+
+    def spacekey(self, backend):
+        """
+        Builds a cache key for a search index built with the current weights.
+
+        Args:
+            backend: backend name
+
+        Returns:
+            cache key
+        """
+
+        return f"{backend}-{hashlib.sha256(self.weight.tobytes()).hexdigest()[:16]}"
+
+    def createengine(self, backend):
+        """
+        Creates a search backend.
+
+        Args:
+            backend: backend name
+
+        Returns:
+            Backend
+        """
+
+        backends = {"numpy": NumPyBackend, "txtai": TxtaiBackend}
+        if backend not in backends:
+            raise ValueError(f"Unknown search backend: {backend}")
+
+        return backends[backend]()
+
+    def index(self, backend, path=None):
+        """
+        Builds a search index over the similarity space. Returns a row id - row offset mapping and search backend.
+
+        Args:
+            backend: backend name
+            path: optional cache directory for the built index
+
+        Returns:
+            data, engine
+        """
+
+        # Map row ids to row offsets
+        data = {uid: x for x, uid in enumerate(self.ids)}
+
+        engine = self.createengine(backend)
+        if path and os.path.exists(path):
+            engine.load(path)
+        else:
+            engine.index(self.ids, self.space, self.norms)
+
+            # Save index, written to a temporary directory first
+            if path:
+                staging = f"{path}.{os.getpid()}.tmp"
+                engine.save(staging)
+                try:
+                    os.replace(staging, path)
+                except OSError:
+                    shutil.rmtree(staging, ignore_errors=True)
+
+        return data, engine
+
+    def metrics(self, name):
+        """
+        Looks up a player's active years, best statistical year and key metrics.
+
+        Args:
+            name: player name
+
+        Returns:
+            active, best, metrics
+        """
+
+        if name in self.names:
+            # Get player row range and best year
+            start, end, best = self.players.loc[name, ["start", "end", "best"]]
+
+            # Build key metrics
+            metrics = self.stats[["SEASON", "SEASON_ID", self.metric()]].iloc[start:end]
+
+            # Get years active, best year, along with metric trends
+            return (
+                metrics["SEASON"].tolist(),
+                int(best),
+                metrics[["SEASON_ID", self.metric()]].copy(),
+            )
+
+        return range(1871, datetime.datetime.today().year), 1950, None
+
+    def search(self, name=None, year=None, row=None, limit=10):
+        """
+        Runs a vector search. This method takes either a player-year or stats row as input.
+
+        Args:
+            name: player name to search
+            year: year to search
+            row: row of stats to search
+            limit: max results to return
+
+        Returns:
+            list of results
+        """
+
+        if row:
+            query = self.project(self.vector(row))
+        else:
+            # Lookup player-season row
+            query = self.lookup(name, year)
+            query = self.space[query] if query is not None else None
+
+        return (
+            self.results(self.engine.search(query, limit * 5), limit)
+            if query is not None
+            else []
+        )
+
+    def search_many(self, queries, limit=10, batch=256, workers=None):
+        """
+        Runs a batch of vector searches. Queries are scored in chunks with one matrix-matrix product per chunk.
+
+        Args:
+            queries: list of (name, year) pairs or a DataFrame of stats rows
+            limit: max results to return per query
+            batch: number of queries scored per chunk
+            workers: optional number of worker threads used to score chunks in parallel
+
+        Returns:
+            list of results, one per query
+        """
+
+        if isinstance(queries, pd.DataFrame):
+            # Build query matrix from stats rows, missing values are filled when projected
+            vectors = self.project(
+                queries.reindex(columns=self.features()).to_numpy(
+                    dtype=np.float32, na_value=np.nan
+                )
+            )
+            valid = np.arange(len(vectors))
+        else:
+            # Lookup player-season rows, unknown player-seasons have no results
+            offsets = [self.lookup(name, year) for name, year in queries]
+            valid = np.array([x for x, y in enumerate(offsets) if y is not None])
+            vectors = self.space[[offsets[x] for x in valid]]
+
+        # Split queries into chunks
+        chunks = [vectors[x : x + batch] for x in range(0, len(vectors), batch)]
+
+        def run(chunk):
+            return self.engine.batch(chunk, limit * 5)
+
+        # Score chunks, NumPy releases the GIL during matrix products
+        if workers and len(chunks) > 1:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                matches = list(executor.map(run, chunks))
+        else:
+            matches = [run(chunk) for chunk in chunks]
+
+        results = [[] for _ in range(len(queries))]
+        for x, match in zip(valid, (match for chunk in matches for match in chunk)):
+            results[x] = self.results(match, limit)
+
+        return results
+
+    def lookup(self, name, year):
+        """
+        Looks up the row offset for a player-season.
+
+        Args:
+            name: player name
+            year: season start year
+
+        Returns:
+            row offset or None if not found
+        """
+
+        # Lookup player key and build row id
+        name = self.names.get(name)
+        return self.data.get(f"{year}{name[0]}") if name else None
+
+    def results(self, matches, limit):
+        """
+        Builds search results from a list of matches, keeping the best match for each unique player.
+
+        Args:
+            matches: list of (id, score) sorted by score descending
+            limit: max results to return
+
+        Returns:
+            list of results
+        """
+
+        results, ids = [], set()
+        for uid, _ in matches:
+            # Only add unique players
+            if uid[4:] not in ids:
+                # Only the returned rows are converted to dictionaries
+                result = self.stats.iloc[[self.data[uid]]].to_dict(orient="records")[0]
+                result[
+                    "link"
+                ] = f'https://www.nba.com/stats/player/{result["PLAYER_ID"]}?PerMode={self.mode()}'
+                results.append(result)
+                ids.add(uid[4:])
+
+                if len(ids) >= limit:
+                    break
+
+        return results
+
+    def transform(self, row):
+        """
+        Transforms a stats row into a vector.
+
+        Args:
+            row: stats row
+
+        Returns:
+            vector
+        """
+
+        if isinstance(row, np.ndarray):
+            return row
+
+        # Missing values stay NaN, they are filled when projected
+        return np.array(
+            [np.nan if row.get(x) is None else row.get(x) for x in self.features()],
+            dtype=np.float32,
+        )
+
+
+class Counting(Stats):
+    """
+    Counting Stats
+    """
+
+    def loadcolumns(self):
+        return [
+            "PLAYER_ID",
+            "PLAYER_NAME",
+            "SEASON_ID",
+            "LEAGUE_ID",
+            "TEAM_ID",
+            "TEAM_ABBREVIATION",
+            "PLAYER_AGE",
+            "GP",
+            "GS",
+            "MIN",
+            "FGM",
+            "FGA",
+            "FG_PCT",
+            "FG3M",
+            "FG3A",
+            "FG3_PCT",
+            "FTM",
+            "FTA",
+            "FT_PCT",
+            "OREB",
+            "DREB",
+            "REB",
+            "AST",
+            "STL",
+            "BLK",
+            "TOV",
+            "PF",
+            "PTS",
+        ]
+
+    def mode(self):
+        return "Totals"
+
+    def games(self):
+        # Require player to have at least 40 Games
+        return 40
+
+
+class PerGame(Stats):
+    """
+    Per Game stats.
+    """
+
+    def loadcolumns(self):
+        return [
+            "PLAYER_ID",
+            "PLAYER_NAME",
+            "SEASON_ID",
+            "LEAGUE_ID",
+            "TEAM_ID",
+            "TEAM_ABBREVIATION",
+            "PLAYER_AGE",
+            "GP",
+            "GS",
+            "MIN",
+            "FGM",
+            "FGA",
+            "FG_PCT",
+            "FG3M",
+            "FG3A",
+            "FG3_PCT",
+            "FTM",
+            "FTA",
+            "FT_PCT",
+            "OREB",
+            "DREB",
+            "REB",
+            "AST",
+            "STL",
+            "BLK",
+            "TOV",
+            "PF",
+            "PTS",
+        ]
+
+    def mode(self):
+        return "PerGame"
+
+    def games(self):
+        # Require player to have 20 games played
+        return 20
+
+    # def metric(self):
+    #     return "WADJ"
+
+    # def vector(self, row):
+    #     row["WHIP"] = (
+    #         (row["BB"] + row["H"]) / (row["IPouts"] / 3) if row["IPouts"] else None
+    #     )
+    #     row["WADJ"] = (
+    #         (row["W"] + row["SV"]) / (row["ERA"] + row["WHIP"])
+    #         if row["ERA"] and row["WHIP"]
+    #         else None
+    #     )
+
+    #     return self.transform(row)
+
+
+class Per36(PerGame):
+    """
+    Per 36 minutes stats.
+    """
+
+    def mode(self):
+        return "Per36"
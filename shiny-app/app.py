@@ -1,30 +1,24 @@
 # Imports
+import asyncio
+
 from shiny import render, ui, App, reactive
 from shiny.types import ImgData
 import pandas as pd
 import shinyswatch
-import urllib.request
-from pathlib import Path
-
-# Load in all players
-all_players = pd.read_csv(
-    "https://raw.githubusercontent.com/austinbarish/basketball-statistics/main/data/per-game-stats.csv"
-)
 
-# Create a dict of player-name:player-name
-player_names = {name: name for name in all_players["PLAYER_NAME"].unique()}
+from dataset import Dataset
+from images import ImageCache
+from lookup import NO_GUESS
+from metrics import metrics, ratio, serve, timed
 
-# Add a starting guess
-player_names["Type Your Guess Here"] = "Type Your Guess Here"
+# Load and prepare all players once per process
+dataset = Dataset()
 
-# Get all Teams
-all_teams = all_players["TEAM_ABBREVIATION"].unique()
+# Create a dict of player-id:player-name, with a starting guess
+player_names = dict(dataset.get().lookup.choices)
 
-# Add a starting guess
-all_teams = ["All"] + list(all_teams)
-
-# Remove NaN Team
-all_teams = [team for team in all_teams if str(team) != "nan"]
+# Get all Teams from the team stints, with a starting guess
+all_teams = ["All"] + list(dataset.get().sampler.teams)
 
 # App UI
 app_ui = ui.page_fluid(
@@ -65,7 +59,7 @@ app_ui = ui.page_fluid(
             label="Select Player",
             choices=player_names,
             selectize=True,
-            selected="Type Your Guess Here",
+            selected=NO_GUESS,
         ),
         ui.output_image("answer_headshot", inline=True),
         ui.output_text_verbatim("guess"),
@@ -101,32 +95,12 @@ app_ui = ui.page_fluid(
 
 
 # Function to get a random player given the filters
-def random_player(all_players, season_range=[1946, 2023], min_points=0.0, team="All"):
-    # Add a Year column for easier filtering
-    seasons = all_players["Season"]
-    all_players["Year"] = [int(s.split("-")[0]) for s in seasons]
-
-    # Filter out players not on the team
-    if team != "All":
-        all_player_options = all_players[all_players["Team"] == team]
-    else:
-        all_player_options = all_players
-
-    # Filter out seasons before earliest_season
-    all_player_options = all_player_options[
-        all_player_options["Year"] >= season_range[0]
-    ]
-
-    # Filter out seasons after latest_season
-    all_player_options = all_player_options[
-        all_player_options["Year"] <= season_range[1]
-    ]
-
-    # Filter out players with less than min_points per game
-    all_player_options = all_player_options[all_player_options["PTS"] >= min_points]
+def random_player(data, season_range=[1946, 2023], min_points=0.0, team="All"):
+    # Draw a random player from the players that meet the criteria
+    player_id = data.sampler.sample(season_range, min_points, team)
 
     # Return a better error message if there are no players that meet the criteria
-    if len(all_player_options) == 0:
+    if player_id is None:
         return (
             1,
             "No Players Meet the Criteria",
@@ -139,12 +113,8 @@ def random_player(all_players, season_range=[1946, 2023], min_points=0.0, team="
             ),
         )
 
-    # Get a random player
-    player_id = all_player_options["ID"].sample()
-    player_id = player_id.values[0]
-
     # Get all his stats
-    player_stats = all_players[all_players["ID"] == player_id]
+    player_stats = data.lookup.rows(player_id)
 
     # Get his name
     player_name = player_stats["Name"].values[0]
@@ -157,12 +127,83 @@ def random_player(all_players, season_range=[1946, 2023], min_points=0.0, team="
     return player_id, player_name, player_stats
 
 
+# Image cache shared by every session
+images = ImageCache()
+
+# Report image and sampler cache counters with the metrics
+metrics.source(
+    "images",
+    lambda: dict(ratio(images.hits, images.misses), bytes_fetched=images.fetched),
+)
+metrics.source(
+    "sampler",
+    lambda: ratio(*dataset.get().sampler.eligible.cache_info()[:2]),
+)
+
+
+# Load the static images in the background while the app starts
+images.prefetch_static("nba")
+images.prefetch_static("mutumbo")
+
+
+# Function to get the path from a finished download, or None and render again once it finishes
+#
+# Shiny sends all outputs of a flush together, so downloads are never awaited. When a download
+# finishes, arrived is bumped and the images render again in a later flush.
+def downloaded(future, arrived):
+    # Render again whenever one of the session's downloads finishes
+    arrived()
+
+    if future.done():
+        return future.result()
+
+    loop = asyncio.get_running_loop()
+    future.add_done_callback(
+        lambda _: loop.call_soon_threadsafe(
+            lambda: asyncio.ensure_future(arrive(arrived))
+        )
+    )
+    return None
+
+
+# Function to build the image data for a static image, None until it is loaded
+def static_image(name, arrived):
+    path = downloaded(images.prefetch_static(name), arrived)
+    if path is None:
+        return None
+
+    img: ImgData = {"src": str(path), "width": "100px"}
+    return img
+
+
+# Function to build the image data for a player's headshot, the NBA logo until it is downloaded or
+# if there is none
+def headshot_image(player_id, arrived):
+    path = downloaded(images.prefetch(player_id), arrived)
+    if path is None:
+        return static_image("nba", arrived)
+
+    img: ImgData = {"src": str(path), "width": "100px"}
+    return img
+
+
+# Function to render a session's images again once a download finishes, runs on the session's event loop
+async def arrive(arrived):
+    with reactive.isolate():
+        arrived.set(arrived() + 1)
+
+    await reactive.flush()
+
+
 def server(input, output, session):
     # Create a server object
     server = type("Server", (), {})()
 
-    # Create a previous player that will never match
-    server.previous_player = "Adam Silver"
+    # Create a previous player id that will never match
+    server.previous_player = None
+
+    # Number of finished image downloads, images depend on it to fill in when they arrive
+    arrived = reactive.Value(0)
 
     # Text instructions
     @output
@@ -179,117 +220,32 @@ def server(input, output, session):
     @output
     @render.data_frame
     @reactive.event(input.refresh, ignore_none=False)
+    @timed("player_stats_table")
     def player_stats_table():
-        all_players = pd.read_csv(
-            "https://raw.githubusercontent.com/austinbarish/basketball-statistics/main/data/per-game-stats.csv"
-        )
-        # Keep only the columns we want
-        # Player_id, name, season, Team, age, GP, GS, MP, FG, FGA, 3P, 3PA, 2P, 2PA, FT, FTA, ORB, DRB, TRB, AST, STL, BLK, TOV, PF, PTS
-        all_players = all_players[
-            [
-                "PLAYER_ID",
-                "PLAYER_NAME",
-                "SEASON_ID",
-                "TEAM_ABBREVIATION",
-                "PLAYER_AGE",
-                "GP",
-                "GS",
-                "MIN",
-                "FGM",
-                "FGA",
-                "FG3M",
-                "FG3A",
-                "FTM",
-                "FTA",
-                "OREB",
-                "DREB",
-                "REB",
-                "AST",
-                "STL",
-                "BLK",
-                "TOV",
-                "PF",
-                "PTS",
-            ]
-        ]
-
-        # Rename Key Columns
-        all_players.rename(
-            {
-                "PLAYER_ID": "ID",
-                "PLAYER_NAME": "Name",
-                "SEASON_ID": "Season",
-                "TEAM_ABBREVIATION": "Team",
-                "PLAYER_AGE": "Age",
-                "FG3M": "3PM",
-                "FG3A": "3PA",
-            },
-            axis=1,
-            inplace=True,
-        )
-
-        # Order Columns to be ID, Name, Season, Team, Age, GP, GS, MIN, PTS, REB, AST, STL, BLK, TOV, 3PM, 3PA, FGM, FGA, FTM, FTA, OREB, DREB, PF
-        all_players = all_players[
-            [
-                "ID",
-                "Name",
-                "Season",
-                "Team",
-                "Age",
-                "GP",
-                "GS",
-                "MIN",
-                "PTS",
-                "REB",
-                "AST",
-                "STL",
-                "BLK",
-                "TOV",
-                "3PM",
-                "3PA",
-                "FGM",
-                "FGA",
-                "FTM",
-                "FTA",
-                "PF",
-            ]
-        ]
-
-        # Filter out the TOT team rows as those are for totals
-        all_players = all_players[all_players["Team"] != "TOT"]
-
-        # Divide all stats by GP to get per game stats
-        all_players["GP"] = all_players["GP"].astype(float)
-        all_players["MIN"] = round(all_players["MIN"] / all_players["GP"], 1)
-        all_players["PTS"] = round(all_players["PTS"] / all_players["GP"], 1)
-        all_players["REB"] = round(all_players["REB"] / all_players["GP"], 1)
-        all_players["AST"] = round(all_players["AST"] / all_players["GP"], 1)
-        all_players["STL"] = round(all_players["STL"] / all_players["GP"], 1)
-        all_players["BLK"] = round(all_players["BLK"] / all_players["GP"], 1)
-        all_players["TOV"] = round(all_players["TOV"] / all_players["GP"], 1)
-        all_players["3PM"] = round(all_players["3PM"] / all_players["GP"], 1)
-        all_players["3PA"] = round(all_players["3PA"] / all_players["GP"], 1)
-        all_players["FGM"] = round(all_players["FGM"] / all_players["GP"], 1)
-        all_players["FGA"] = round(all_players["FGA"] / all_players["GP"], 1)
-        all_players["FTM"] = round(all_players["FTM"] / all_players["GP"], 1)
-        all_players["FTA"] = round(all_players["FTA"] / all_players["GP"], 1)
-        all_players["PF"] = round(all_players["PF"] / all_players["GP"], 1)
-
-        # Replace All NaN values with "Untracked"
-        all_players.fillna("Untracked", inplace=True)
+        # Shared per game display table and indexes, prepared once per process
+        data = dataset.get()
+        lookup = data.lookup
 
         # Get player name and stats
         player_id, player_name, player_stats = random_player(
-            all_players,
+            data,
             season_range=input.year_range(),
             min_points=input.minimum_ppg(),
             team=input.team(),
         )
 
+        # Start downloading the answer's headshot while the table renders
+        if player_name != "No Players Meet the Criteria":
+            images.prefetch(player_id)
+
+        # Replace NaN values with "Untracked" for the rows shown only
+        player_stats = player_stats.astype(object).fillna("Untracked")
+
         # Save player_name outside the function
         server.player_name = player_name
 
         @render.text
+        @timed("answer")
         def answer():
             # If real player name is selected, return the correct player
             if player_name != "No Players Meet the Criteria":
@@ -300,248 +256,74 @@ def server(input, output, session):
                 return f"No Players Meet the Criteria. Try changing the minimum year, minimum PPG, or team."
 
         @render.text
+        @timed("guess")
         def guess():
-            # Get the player_id for the guess and answer to avoid any errors
-            if (
-                input.guess() in player_names
-                and input.guess() != "Type Your Guess Here"
-            ):
-                # In case there is no player available.
-                try:
-                    guess_id = [
-                        id
-                        for id in all_players[all_players["Name"] == input.guess()][
-                            "ID"
-                        ]
-                    ].pop()
-                    answer_id = [
-                        id
-                        for id in all_players[
-                            all_players["Name"] == server.player_name
-                        ]["ID"]
-                    ].pop()
-
-                except IndexError:
-                    guess_id = 1
-                    answer_id = 2
-
-            # If guess is blank, return different IDs
-            else:
-                guess_id = 1
-                answer_id = 2
+            # Get the player_id for the guess, None if it isn't a player
+            guess_id = lookup.guess(input.guess())
 
             # If no player is selected, return a message
             if player_name == "No Players Meet the Criteria":
                 # Show the NBA Logo while waiting on a Guess
                 @render.image
+                @timed("answer_headshot")
                 def answer_headshot():
-                    # Get the current directory
-                    current_dir = Path.cwd()
-
-                    # Create the directory for the images if it doesn't exist
-                    image_dir = current_dir / "images"
-                    image_dir.mkdir(exist_ok=True)
-
-                    # Create the path for the image
-                    image_path = image_dir / f"nba.png"
-
-                    urllib.request.urlretrieve(
-                        "https://images.ctfassets.net/h8q6lxmb5akt/5qXnOINbPrHKXWa42m6NOa/421ab176b501f5bdae71290a8002545c/nba-logo_2x.png",
-                        image_path,
-                    )
-
-                    # Create the image data
-                    img: ImgData = {"src": image_path, "width": "100px"}
-                    return img
+                    return static_image("nba", arrived)
 
                 return f"N/A - No Players Meet the Criteria"
 
-            elif input.guess() == "Type Your Guess Here":
+            elif input.guess() == NO_GUESS:
                 # Show the NBA Logo while waiting on a Guess
                 @render.image
+                @timed("answer_headshot")
                 def answer_headshot():
-                    # Get the current directory
-                    current_dir = Path.cwd()
-
-                    # Create the directory for the images if it doesn't exist
-                    image_dir = current_dir / "images"
-                    image_dir.mkdir(exist_ok=True)
-
-                    # Create the path for the image
-                    image_path = image_dir / f"nba.png"
-
-                    urllib.request.urlretrieve(
-                        "https://images.ctfassets.net/h8q6lxmb5akt/5qXnOINbPrHKXWa42m6NOa/421ab176b501f5bdae71290a8002545c/nba-logo_2x.png",
-                        image_path,
-                    )
-
-                    # Create the image data
-                    img: ImgData = {"src": image_path, "width": "100px"}
-                    return img
+                    return static_image("nba", arrived)
 
                 return "Please Select a Player"
 
-            # Compare IDs for safety
-            elif answer_id == guess_id:
+            # Compare IDs so players who share a name never collide
+            elif guess_id == player_id:
                 # Show the Correct Player's Headshot for correct answers
                 @render.image
+                @timed("answer_headshot")
                 def answer_headshot():
-                    # Create the url for the image
-                    image_url = "https://ak-static.cms.nba.com/wp-content/uploads/headshots/nba/latest/260x190/{player_id}.png".format(
-                        player_id=player_id
-                    )
-
-                    # Get the current directory
-                    current_dir = Path.cwd()
-
-                    # Create the directory for the images if it doesn't exist
-                    image_dir = current_dir / "images"
-                    image_dir.mkdir(exist_ok=True)
-
-                    # Create the path for the image
-                    image_path = image_dir / f"{player_name}.png"
+                    return headshot_image(player_id, arrived)
 
-                    # Try image
-                    try:
-                        urllib.request.urlretrieve(image_url, image_path)
-                    except urllib.error.HTTPError:
-                        urllib.request.urlretrieve(
-                            "https://images.ctfassets.net/h8q6lxmb5akt/5qXnOINbPrHKXWa42m6NOa/421ab176b501f5bdae71290a8002545c/nba-logo_2x.png",
-                            image_path,
-                        )
-
-                    # Create the image data
-                    img: ImgData = {"src": image_path, "width": "100px"}
-                    return img
-
-                server.previous_player = player_name
+                server.previous_player = player_id
 
                 return f"CORRECT! The player was {server.player_name}."
 
             # If the guess is the previous player, tell them to select a new player
-            elif input.guess() == server.previous_player:
+            elif guess_id is not None and guess_id == server.previous_player:
                 # Show the NBA Logo while waiting on a Guess
                 @render.image
+                @timed("answer_headshot")
                 def answer_headshot():
-                    # Get the current directory
-                    current_dir = Path.cwd()
-
-                    # Create the directory for the images if it doesn't exist
-                    image_dir = current_dir / "images"
-                    image_dir.mkdir(exist_ok=True)
-
-                    # Create the path for the image
-                    image_path = image_dir / f"nba.png"
-
-                    urllib.request.urlretrieve(
-                        "https://images.ctfassets.net/h8q6lxmb5akt/5qXnOINbPrHKXWa42m6NOa/421ab176b501f5bdae71290a8002545c/nba-logo_2x.png",
-                        image_path,
-                    )
-
-                    # Create the image data
-                    img: ImgData = {"src": image_path, "width": "100px"}
-                    return img
+                    return static_image("nba", arrived)
 
                 return "Please Select the New Player"
 
             else:
                 # Show the Incorrect Player's Headshot for incorrect answers
                 @render.image
+                @timed("answer_headshot")
                 def answer_headshot():
-                    guess_name = input.guess()
-                    # Get the player_id for the guess
-                    guess_id = all_players[all_players["Name"] == guess_name]["ID"]
-
                     # If guess is blank, return mutumbo
-                    if len(guess_id) == 0:
-                        # Get the current directory
-                        current_dir = Path.cwd()
-
-                        # Create the directory for the images if it doesn't exist
-                        image_dir = current_dir / "images"
-                        image_dir.mkdir(exist_ok=True)
-
-                        # Create Mutumbo path
-                        image_path = image_dir / f"mutumbo.png"
-
-                        urllib.request.urlretrieve(
-                            "https://media.tenor.com/images/b144b620392ccd1cd9ccea5ca1088995/raw.png",
-                            image_path,
-                        )
-
-                        # Create the image data
-                        img: ImgData = {"src": image_path, "width": "100px"}
-                        return img
-
-                    guess_id = guess_id.values[0]
-
-                    # Create the url for the image
-                    image_url = "https://ak-static.cms.nba.com/wp-content/uploads/headshots/nba/latest/260x190/{guess_id}.png".format(
-                        guess_id=guess_id
-                    )
-                    # Get the current directory
-                    current_dir = Path.cwd()
-
-                    # Create the directory for the images if it doesn't exist
-                    image_dir = current_dir / "images"
-                    image_dir.mkdir(exist_ok=True)
-
-                    # Create the path for the image
-                    image_path = image_dir / f"{guess_name}.png"
-
-                    # Try image
-                    try:
-                        urllib.request.urlretrieve(image_url, image_path)
+                    if guess_id is None:
+                        return static_image("mutumbo", arrived)
 
                     # Show the nba logo if the image doesn't exist
-                    except urllib.error.HTTPError:
-                        # Create NBA path
-                        image_path = image_dir / f"nba.png"
-
-                        urllib.request.urlretrieve(
-                            "https://images.ctfassets.net/h8q6lxmb5akt/5qXnOINbPrHKXWa42m6NOa/421ab176b501f5bdae71290a8002545c/nba-logo_2x.png",
-                            image_path,
-                        )
-
-                    # Create the image data
-                    img: ImgData = {"src": image_path, "width": "100px"}
-                    return img
+                    return headshot_image(guess_id, arrived)
 
                 # If guess is not a player, tell them to select a player
-                if input.guess() not in player_names:
+                if guess_id is None:
                     return f"Please Select a Player"
 
-                return f"Incorrect. You guessed {input.guess()}."
+                return f"Incorrect. You guessed {lookup.names[guess_id]}."
 
         @render.image
+        @timed("headshot")
         def headshot():
-            # Create the url for the image
-            image_url = "https://ak-static.cms.nba.com/wp-content/uploads/headshots/nba/latest/260x190/{player_id}.png".format(
-                player_id=player_id
-            )
-
-            # Get the current directory
-            current_dir = Path.cwd()
-
-            # Create the directory for the images if it doesn't exist
-            image_dir = current_dir / "images"
-            image_dir.mkdir(exist_ok=True)
-
-            # Create the path for the image
-            image_path = image_dir / f"{player_name}.png"
-
-            # Try image
-            try:
-                urllib.request.urlretrieve(image_url, image_path)
-            except urllib.error.HTTPError:
-                urllib.request.urlretrieve(
-                    "https://images.ctfassets.net/h8q6lxmb5akt/5qXnOINbPrHKXWa42m6NOa/421ab176b501f5bdae71290a8002545c/nba-logo_2x.png",
-                    image_path,
-                )
-
-            # Create the image data
-            img: ImgData = {"src": image_path, "width": "100px"}
-            return img
+            return headshot_image(player_id, arrived)
 
         # If teams_only is selected, return a table of only the years and teams
         if input.teams_only():
@@ -556,3 +338,6 @@ def server(input, output, session):
 
 # Create the app
 app = App(app_ui, server)
+
+# Serve metrics at /metrics when enabled
+app = serve(app)
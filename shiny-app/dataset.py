@@ -0,0 +1,216 @@
+# Imports
+import os
+import threading
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from lookup import Lookup, index
+from sampler import Sampler, summarize
+from snapshot import SNAPSHOT_PATH, attach
+
+# Bundled player data, shipped with the app so startup never depends on GitHub
+DATA_PATH = Path(
+    os.environ.get(
+        "NBA_DATA_PATH", Path(__file__).parent / "data" / "total-seasons.parquet"
+    )
+)
+
+# Optional URL (Parquet or CSV) to refresh the player data from in the background, with the team
+# stints at the same URL with -stints in place of -seasons
+DATA_URL = os.environ.get("NBA_DATA_URL", "")
+
+# Seconds between background refreshes, daily by default
+REFRESH_INTERVAL = float(os.environ.get("NBA_DATA_REFRESH_INTERVAL", 24 * 60 * 60))
+
+# Columns to keep and their display names
+# Player_id, name, season, Team, age, GP, GS, MP, FG, FGA, 3P, 3PA, FT, FTA, ORB, DRB, TRB, AST, STL, BLK, TOV, PF, PTS
+COLUMNS = {
+    "PLAYER_ID": "ID",
+    "PLAYER_NAME": "Name",
+    "SEASON_ID": "Season",
+    "TEAM_ABBREVIATION": "Team",
+    "PLAYER_AGE": "Age",
+    "GP": "GP",
+    "GS": "GS",
+    "MIN": "MIN",
+    "FGM": "FGM",
+    "FGA": "FGA",
+    "FG3M": "3PM",
+    "FG3A": "3PA",
+    "FTM": "FTM",
+    "FTA": "FTA",
+    "OREB": "OREB",
+    "DREB": "DREB",
+    "REB": "REB",
+    "AST": "AST",
+    "STL": "STL",
+    "BLK": "BLK",
+    "TOV": "TOV",
+    "PF": "PF",
+    "PTS": "PTS",
+}
+
+# Order Columns to be ID, Name, Season, Team, Age, GP, GS, MIN, PTS, REB, AST, STL, BLK, TOV, 3PM, 3PA, FGM, FGA, FTM, FTA, PF
+ORDER = [
+    "ID",
+    "Name",
+    "Season",
+    "Team",
+    "Age",
+    "GP",
+    "GS",
+    "MIN",
+    "PTS",
+    "REB",
+    "AST",
+    "STL",
+    "BLK",
+    "TOV",
+    "3PM",
+    "3PA",
+    "FGM",
+    "FGA",
+    "FTM",
+    "FTA",
+    "PF",
+]
+
+
+# Counting stats shown per game
+PER_GAME = [
+    "MIN",
+    "PTS",
+    "REB",
+    "AST",
+    "STL",
+    "BLK",
+    "TOV",
+    "3PM",
+    "3PA",
+    "FGM",
+    "FGA",
+    "FTM",
+    "FTA",
+    "PF",
+]
+
+
+# Function to get the team stints file or URL next to a player-season file or URL
+def stints_source(source):
+    return str(source).replace("-seasons.", "-stints.")
+
+
+# Function to read season totals and team stints and prepare them
+def read_prepared(source):
+    return prepare(read_players(source), read_players(stints_source(source)))
+
+
+# Function to read season totals from a Parquet or CSV file or URL, by extension
+def read_players(source):
+    source = str(source)
+
+    # Parquet needs pyarrow, which is in requirements.txt
+    if source.endswith(".parquet"):
+        return pd.read_parquet(source)
+
+    return pd.read_csv(source)
+
+
+# Function to prepare season totals into the per game display table and team stints
+#
+# Season totals have one row per player-season, traded players' rows are labeled with their teams
+# (MIL/CIN). Both tables are written by code/convert.py.
+def prepare(raw, stints):
+    # Keep only the columns we want, renamed and in display order
+    players = raw[list(COLUMNS)].rename(COLUMNS, axis=1)[ORDER]
+
+    # Keep each player's seasons together
+    players = players.sort_values("ID", kind="stable").reset_index(drop=True)
+
+    # Divide all counting stats by GP at once to get per game stats, missing stats stay NaN
+    players[PER_GAME] = (
+        players[PER_GAME].to_numpy(dtype=float)
+        / players["GP"].to_numpy(dtype=float).reshape(-1, 1)
+    ).round(1)
+
+    # Add a Year column for easier filtering
+    players["Year"] = players["Season"].str[:4].astype(int)
+
+    # Team stints, one row per player, season and team
+    stints = stints[["PLAYER_ID", "SEASON_ID", "TEAM_ABBREVIATION"]].rename(
+        COLUMNS, axis=1
+    )
+
+    return players, stints
+
+
+# Prepared players and the indexes built from them, replaced together on refresh
+class Prepared:
+    def __init__(self, players, stints=None, career=None, lookup=None):
+        # Per game display table
+        self.players = players
+
+        # Random player sampler over the career summary
+        self.sampler = Sampler(*(career if career else summarize(players, stints)))
+
+        # Name and id lookups for guesses, headshots and display rows
+        self.lookup = Lookup(players, *(lookup if lookup else index(players)))
+
+
+# Function to load prepared players, from the deploy time snapshot if it is up to date
+def load(path, snapshot=SNAPSHOT_PATH):
+    vocab = Path(snapshot) / "vocab.json"
+    modified = max(Path(x).stat().st_mtime for x in [path, stints_source(path)])
+    if vocab.exists() and vocab.stat().st_mtime >= modified:
+        try:
+            players, career, lookup = attach(snapshot)
+            return Prepared(players, career=career, lookup=lookup)
+        except (OSError, ValueError, KeyError) as e:
+            # Old or partial snapshot, prepare the bundled data instead
+            print(f"Error attaching snapshot {snapshot}: {str(e)}")
+
+    return Prepared(*read_prepared(path))
+
+
+# Process-wide prepared player data, shared by every session
+class Dataset:
+    def __init__(
+        self,
+        path=DATA_PATH,
+        url=DATA_URL,
+        interval=REFRESH_INTERVAL,
+        snapshot=SNAPSHOT_PATH,
+    ):
+        # Attach to the snapshot or load and prepare the bundled data once
+        self.data = load(path, snapshot)
+
+        # Refresh from the URL in the background, if one is configured
+        self.url = url
+        self.interval = interval
+        if url:
+            threading.Thread(target=self.run, daemon=True).start()
+
+    # Current prepared players and indexes, never mutate the returned frames
+    def get(self):
+        return self.data
+
+    # Replace the prepared players with a fresh copy from the URL
+    def refresh(self):
+        try:
+            data = Prepared(*read_prepared(self.url))
+        except Exception as e:
+            # Keep serving the current data if the refresh fails or is throttled
+            print(f"Error refreshing player data from {self.url}: {str(e)}")
+            return False
+
+        # Swap in the new data, sessions pick it up on their next refresh
+        self.data = data
+        return True
+
+    # Background refresh loop
+    def run(self):
+        while True:
+            time.sleep(self.interval)
+            self.refresh()
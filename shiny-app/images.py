@@ -0,0 +1,263 @@
+# Imports
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Headshot URL, can point at a local stand-in server for testing
+HEADSHOT_URL = os.environ.get(
+    "NBA_HEADSHOT_URL",
+    "https://ak-static.cms.nba.com/wp-content/uploads/headshots/nba/latest/260x190/{player_id}.png",
+)
+
+# On-disk cache directory and size limit
+CACHE_DIR = Path(os.environ.get("NBA_IMAGE_CACHE", Path.cwd() / "images"))
+CACHE_BYTES = int(os.environ.get("NBA_IMAGE_CACHE_BYTES", 64 * 1024 * 1024))
+
+# Number of recently served headshot paths kept in memory
+MEMORY_ITEMS = 512
+
+# Seconds to remember that a headshot doesn't exist
+MISSING_TTL = 24 * 60 * 60
+
+# Seconds to wait on the image server
+TIMEOUT = 5.0
+
+# Concurrent downloads, also the size of the connection pool
+WORKERS = int(os.environ.get("NBA_IMAGE_WORKERS", 8))
+
+# Static fallback images, bundled with the app in the static folder
+STATIC_DIR = Path(__file__).parent / "static"
+
+# Where to get a static image once if it isn't bundled
+STATIC_URLS = {
+    "nba": "https://images.ctfassets.net/h8q6lxmb5akt/5qXnOINbPrHKXWa42m6NOa/421ab176b501f5bdae71290a8002545c/nba-logo_2x.png",
+    "mutumbo": "https://media.tenor.com/images/b144b620392ccd1cd9ccea5ca1088995/raw.png",
+}
+
+
+# Size-bounded image cache for player headshots
+#
+# Recent: paths of recently served headshots, found without a disk index lookup. Shiny still reads
+# the file from disk to send it.
+# Disk tier: downloaded images, evicted least recently used first once over the size limit
+# Missing: headshots the server returned 404 for, not requested again until they expire
+class ImageCache:
+    def __init__(
+        self,
+        directory=CACHE_DIR,
+        max_bytes=CACHE_BYTES,
+        memory_items=MEMORY_ITEMS,
+        url=HEADSHOT_URL,
+        timeout=TIMEOUT,
+        missing_ttl=MISSING_TTL,
+        workers=WORKERS,
+    ):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        self.max_bytes = max_bytes
+        self.memory_items = memory_items
+        self.url = url
+        self.timeout = timeout
+        self.missing_ttl = missing_ttl
+
+        self.lock = threading.Lock()
+        self.memory = OrderedDict()
+        self.missing = {}
+
+        # Shared keep-alive connections and download threads, downloads never run on the event loop
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+
+        # Downloads in flight, so concurrent requests for a headshot share one download
+        self.pending = {}
+
+        # Counters
+        self.hits, self.misses, self.fetched = 0, 0, 0
+
+        # Index existing headshots, least recently used first
+        files = sorted(
+            self.directory.glob("headshot-*.png"), key=lambda x: x.stat().st_mtime
+        )
+        self.disk = OrderedDict((path, path.stat().st_size) for path in files)
+        self.size = sum(self.disk.values())
+
+    # Function to get the path to a player's headshot, None if the player has no headshot
+    def headshot(self, player_id):
+        key = f"headshot-{player_id}"
+
+        with self.lock:
+            # Recently served
+            if key in self.memory:
+                self.memory.move_to_end(key)
+                self.disk.move_to_end(self.memory[key])
+                self.hits += 1
+                return self.memory[key]
+
+            # Known missing headshot
+            if self.missing.get(key, 0) > time.time():
+                self.hits += 1
+                return None
+
+            # Disk tier
+            path = self.directory / f"{key}.png"
+            if path in self.disk:
+                self.touch(key, path)
+                self.hits += 1
+                return path
+
+            self.misses += 1
+
+        # Download outside of the lock so other images aren't blocked
+        try:
+            data = self.fetch(self.url.format(player_id=player_id))
+        except requests.HTTPError as e:
+            if e.response is not None and e.response.status_code == 404:
+                with self.lock:
+                    self.missing[key] = time.time() + self.missing_ttl
+            return None
+        except OSError:
+            # Network errors and timeouts aren't cached, the next render tries again
+            return None
+
+        return self.store(key, data)
+
+    # Function to start downloading a player's headshot in the background, returns a Future of the path
+    def prefetch(self, player_id):
+        key = f"headshot-{player_id}"
+
+        with self.lock:
+            # Join a download already in flight
+            if key in self.pending:
+                return self.pending[key]
+
+            # Not cached, start a download
+            cached = (
+                key in self.memory
+                or self.missing.get(key, 0) > time.time()
+                or (self.directory / f"{key}.png") in self.disk
+            )
+            if not cached:
+                future = self.executor.submit(self.headshot, player_id)
+                self.pending[key] = future
+
+        # Forget the download once it's done, outside of the lock as the callback may run right away
+        if not cached:
+            future.add_done_callback(lambda _: self.done(key))
+            return future
+
+        # Resolve cached headshots right away
+        future = Future()
+        future.set_result(self.headshot(player_id))
+        return future
+
+    # Function to forget a finished download
+    def done(self, key):
+        with self.lock:
+            self.pending.pop(key, None)
+
+    # Function to start loading a static image in the background, returns a Future of the path
+    def prefetch_static(self, name):
+        key = f"static-{name}"
+
+        with self.lock:
+            # Join a download already in flight
+            if key in self.pending:
+                return self.pending[key]
+
+            # Not bundled or downloaded yet, start a download
+            cached = (STATIC_DIR / f"{name}.png").exists() or (
+                self.directory / f"{key}.png"
+            ).exists()
+            if not cached:
+                future = self.executor.submit(self.static, name)
+                self.pending[key] = future
+
+        # Forget the download once it's done, outside of the lock as the callback may run right away
+        if not cached:
+            future.add_done_callback(lambda _: self.done(key))
+            return future
+
+        # Resolve bundled and downloaded images right away
+        future = Future()
+        future.set_result(self.static(name))
+        return future
+
+    # Function to get the path to a static image, bundled or downloaded once and kept
+    def static(self, name):
+        path = STATIC_DIR / f"{name}.png"
+        if path.exists():
+            return path
+
+        # Not bundled, download it once, it never counts towards the size limit
+        path = self.directory / f"static-{name}.png"
+        if not path.exists():
+            try:
+                self.write(path, self.fetch(STATIC_URLS[name]))
+            except OSError:
+                return None
+
+        return path
+
+    # Function to download an image over the shared connection pool
+    def fetch(self, url):
+        response = self.session.get(url, timeout=self.timeout)
+        response.raise_for_status()
+        data = response.content
+
+        with self.lock:
+            self.fetched += len(data)
+
+        return data
+
+    # Function to save a downloaded headshot and evict old ones
+    def store(self, key, data):
+        path = self.directory / f"{key}.png"
+        self.write(path, data)
+
+        with self.lock:
+            # Replace any copy another session stored at the same time
+            self.size -= self.disk.pop(path, 0)
+            self.disk[path] = len(data)
+            self.size += len(data)
+            self.touch(key, path)
+
+            # Evict least recently used headshots over the size limit, keep the new one
+            while self.size > self.max_bytes and len(self.disk) > 1:
+                old, size = self.disk.popitem(last=False)
+                self.size -= size
+                self.memory.pop(old.stem, None)
+                old.unlink(missing_ok=True)
+
+        return path
+
+    # Function to mark a headshot as recently used, the caller holds the lock
+    def touch(self, key, path):
+        self.disk.move_to_end(path)
+        self.memory[key] = path
+        self.memory.move_to_end(key)
+
+        # Keep the recently served paths bounded
+        while len(self.memory) > self.memory_items:
+            self.memory.popitem(last=False)
+
+        # Keep disk recency across restarts
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    # Function to write a file atomically so readers never see partial images
+    def write(self, path, data):
+        temp = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+        temp.write_bytes(data)
+        os.replace(temp, path)
@@ -0,0 +1,458 @@
+"""
+Load test for the Guess the NBA Player app, run from the shiny-app folder:
+  python loadtest.py --sessions 50 --rounds 5 --output results.json
+  python loadtest.py --sessions 50 --baseline results.json
+
+Starts the app locally with the data URL and the image CDN pointed at local stand-ins, then
+drives simulated sessions over the Shiny websocket through refresh, guess, reveal and filter
+changes. Reports p50/p95/p99 latency per reactive output and action, plus server memory per
+session, and saves them as JSON to compare runs against a baseline. Requires websockets, which is
+installed with shiny.
+"""
+
+# Imports
+import argparse
+import asyncio
+import datetime
+import html
+import json
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import numpy as np
+import websockets
+
+from dataset import DATA_PATH
+
+# Outputs a browser shows, the reveal outputs are only visible while the answer is revealed
+OUTPUTS = ["instructions", "player_stats_table", "answer_headshot", "guess"]
+REVEAL = ["headshot", "answer"]
+
+# Starting inputs of a session
+INPUTS = {
+    "year_range": [2000, 2023],
+    "minimum_ppg": 20,
+    "team": "All",
+    "teams_only": False,
+    "refresh:shiny.action": 0,
+    "guess": "Type Your Guess Here",
+    "answer": False,
+}
+
+# Teams and filters sessions switch between
+TEAMS = ["All", "LAL", "BOS", "CHI", "GSW", "NYK", "SAS", "MIA"]
+
+# Seconds to wait on a single action before counting it as failed
+TIMEOUT = 30.0
+
+# Percentiles to report
+PERCENTILES = [50, 95, 99]
+
+
+# Function to find a free local port
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+# Function to start a local stand-in server in a background thread
+def serve(handler):
+    server = ThreadingHTTPServer(("127.0.0.1", free_port()), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# Function to build a stand-in for the GitHub data URL, serving the bundled data files by name
+def data_handler(directory):
+    files = {path.name: path.read_bytes() for path in Path(directory).glob("*.parquet")}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            data = files.get(self.path.lstrip("/"))
+            if data is None:
+                self.send_error(404)
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+# Function to build a stand-in for the image CDN, with a delay and a share of missing headshots
+def cdn_handler(latency, missing, size):
+    # Any bytes will do, the app never decodes the images
+    image = b"\x89PNG\r\n\x1a\n" + os.urandom(size)
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(latency)
+
+            # Missing headshots are decided per player so every session sees the same ones
+            player = re.sub(r"\D", "", self.path)
+            if player and int(player) % 100 < missing * 100:
+                self.send_error(404)
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "image/png")
+            self.send_header("Content-Length", str(len(image)))
+            self.end_headers()
+            self.wfile.write(image)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+# Function to start the app with its data URL and images pointed at the stand-ins
+def start(port, data_url, cdn_url, images, refresh):
+    env = dict(
+        os.environ,
+        NBA_DATA_URL=data_url,
+        NBA_DATA_REFRESH_INTERVAL=str(refresh),
+        NBA_HEADSHOT_URL=cdn_url,
+        NBA_IMAGE_CACHE=images,
+    )
+
+    # Static images are found in the image cache, so they aren't downloaded from the internet
+    for name in ["nba", "mutumbo"]:
+        Path(images, f"static-{name}.png").write_bytes(b"\x89PNG\r\n\x1a\n")
+
+    process = subprocess.Popen(
+        [sys.executable, "-m", "shiny", "run", "--port", str(port), "app:app"],
+        cwd=Path(__file__).parent,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+    # Wait for the app to serve its page
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1) as r:
+                return process, r.read().decode()
+        except OSError:
+            if process.poll() is not None:
+                break
+            time.sleep(0.2)
+
+    process.kill()
+    raise RuntimeError("App failed to start")
+
+
+# Function to get the guess choices from the app page, {label: value}
+def choices(page):
+    select = re.search(r'<select[^>]*id="guess".*?</select>', page, re.S).group(0)
+    options = re.findall(r'<option value="([^"]*)"[^>]*>(.*?)</option>', select)
+    return {html.unescape(label): value for value, label in options if value.isdigit()}
+
+
+# Function to get the resident memory of a process in MB, None where /proc isn't available
+def memory(pid):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+
+    return None
+
+
+# A simulated player, one websocket session
+class Session:
+    def __init__(self, url, players, timings, rng):
+        self.url = url
+        self.players = players
+        self.timings = timings
+        self.rng = rng
+        self.values = {}
+        self.refreshes = 0
+
+    # Function to send an input update and wait for the outputs it triggers
+    async def action(self, name, data, outputs=()):
+        start = time.perf_counter()
+        await self.ws.send(json.dumps({"method": "update", "data": data}))
+        await self.wait(name, start, outputs)
+
+    # Function to receive messages until the expected outputs arrive and none are recalculating
+    #
+    # Every session is flushed after any session's reactive flush, so flushes without the expected
+    # outputs may belong to other sessions. Actions that don't update outputs end on the next flush.
+    async def wait(self, name, start, outputs):
+        running, expected = set(), set(outputs)
+        while True:
+            message = json.loads(await asyncio.wait_for(self.ws.recv(), TIMEOUT))
+
+            if "recalculating" in message:
+                output = message["recalculating"]
+                if output["status"] == "recalculating":
+                    running.add(output["name"])
+                else:
+                    running.discard(output["name"])
+
+            # Record the time each output arrived at the client
+            if "values" in message:
+                elapsed = time.perf_counter() - start
+                for output, value in message["values"].items():
+                    self.timings.setdefault(f"output:{output}", []).append(elapsed)
+                    self.values[output] = value
+                    expected.discard(output)
+
+                if message.get("errors"):
+                    raise RuntimeError(f"Output errors: {list(message['errors'])}")
+
+                if not running and not expected:
+                    self.timings.setdefault(f"action:{name}", []).append(elapsed)
+                    return
+
+    # Function to play a number of rounds
+    async def run(self, rounds, think):
+        async with websockets.connect(self.url, max_size=None) as ws:
+            self.ws = ws
+
+            # Connect like a browser, with the main outputs visible
+            data = dict(INPUTS)
+            data.update({f".clientdata_output_{x}_hidden": False for x in OUTPUTS})
+            data.update({f".clientdata_output_{x}_hidden": True for x in REVEAL})
+
+            start = time.perf_counter()
+            await ws.send(json.dumps({"method": "init", "data": data}))
+            await self.wait("init", start, OUTPUTS)
+
+            for _ in range(rounds):
+                await self.round(think)
+
+    # Function to play one round: new player, wrong guess, reveal, right guess, filter change
+    async def round(self, think):
+        self.refreshes += 1
+        await self.action(
+            "refresh", {"refresh:shiny.action": self.refreshes}, OUTPUTS[1:]
+        )
+        await asyncio.sleep(think)
+
+        labels = list(self.players)
+        guess = self.players[self.rng.choice(labels)]
+        await self.action("guess", {"guess": guess}, ["guess"])
+        await asyncio.sleep(think)
+
+        # Reveal the answer, then guess it
+        reveal = {f".clientdata_output_{x}_hidden": False for x in REVEAL}
+        await self.action("reveal", dict(reveal, answer=True), REVEAL)
+        await asyncio.sleep(think)
+
+        answer = str(self.values.get("answer", "")).split(": ")[-1]
+        if answer in self.players:
+            await self.action("guess", {"guess": self.players[answer]}, ["guess"])
+            await asyncio.sleep(think)
+
+        hide = {f".clientdata_output_{x}_hidden": True for x in REVEAL}
+        await self.action("hide", dict(hide, answer=False))
+        await asyncio.sleep(think)
+
+        # Change the filters, applied on the next refresh
+        first = self.rng.randint(1946, 2020)
+        await self.action(
+            "filter",
+            {
+                "year_range": [first, self.rng.randint(first, 2023)],
+                "minimum_ppg": self.rng.choice([0, 10, 15, 20, 25]),
+                "team": self.rng.choice(TEAMS),
+            },
+        )
+        await asyncio.sleep(think)
+
+
+# Function to run sessions concurrently, returns timings and failed sessions
+async def simulate(url, players, sessions, rounds, think, ramp, seed):
+    timings, failures = {}, []
+
+    async def play(index):
+        # Stagger session starts over the ramp up
+        await asyncio.sleep(ramp * index / max(sessions, 1))
+        session = Session(url, players, timings, random.Random(seed + index))
+        try:
+            await session.run(rounds, think)
+        except Exception as e:
+            failures.append(f"session {index}: {type(e).__name__}: {e}")
+
+    await asyncio.gather(*(play(x) for x in range(sessions)))
+    return timings, failures
+
+
+# Function to summarize latencies in milliseconds
+def summarize(values):
+    values = np.array(values) * 1000
+    summary = {f"p{p}": round(float(np.percentile(values, p)), 2) for p in PERCENTILES}
+    summary.update(count=len(values), max=round(float(values.max()), 2))
+    return summary
+
+
+# Function to print results, with the change against a baseline when there is one
+def report(results, baseline=None):
+    print(
+        f"{results['config']['sessions']} sessions x {results['config']['rounds']} rounds, "
+        f"{results['failures']} failed, {results['elapsed']:.1f} s"
+    )
+
+    if baseline and baseline["config"] != results["config"]:
+        print(f"Baseline from {baseline['date']} ran with {baseline['config']}")
+
+    print(
+        f"{'':32}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'p95 change':>12}"
+    )
+    for name, summary in results["latency"].items():
+        change = ""
+        if baseline and name in baseline["latency"]:
+            previous = baseline["latency"][name]["p95"]
+            change = f"{(summary['p95'] - previous) / previous * 100:+.1f}%"
+
+        print(
+            f"{name:32}{summary['count']:>8}{summary['p50']:>10.1f}"
+            f"{summary['p95']:>10.1f}{summary['p99']:>10.1f}{change:>12}"
+        )
+
+    memory = results["memory"]
+    if memory["per_session_mb"] is not None:
+        line = (
+            f"Memory: {memory['baseline_mb']:.1f} MB idle, {memory['peak_mb']:.1f} MB peak, "
+            f"{memory['per_session_mb']:.2f} MB per session"
+        )
+        if baseline and baseline["memory"]["per_session_mb"]:
+            line += f" (baseline {baseline['memory']['per_session_mb']:.2f} MB)"
+        print(line)
+
+
+# Function to run a load test, returns the results
+def run(args):
+    # Local stand-ins for the data URL and the image CDN
+    data = serve(data_handler(args.data))
+    cdn = serve(cdn_handler(args.cdn_latency / 1000, args.cdn_missing, args.image_size))
+
+    data_url = f"http://127.0.0.1:{data.server_port}/{DATA_PATH.name}"
+    cdn_url = f"http://127.0.0.1:{cdn.server_port}/headshots/{{player_id}}.png"
+
+    port = free_port()
+    with tempfile.TemporaryDirectory() as images:
+        process, page = start(port, data_url, cdn_url, images, args.refresh_interval)
+        try:
+            # Idle memory, then sample the peak while the sessions play
+            baseline = memory(process.pid)
+            peak = [baseline]
+
+            async def main():
+                async def sample():
+                    while True:
+                        peak.append(memory(process.pid))
+                        await asyncio.sleep(0.2)
+
+                sampler = asyncio.create_task(sample())
+                try:
+                    return await simulate(
+                        f"ws://127.0.0.1:{port}/websocket/",
+                        choices(page),
+                        args.sessions,
+                        args.rounds,
+                        args.think / 1000,
+                        args.ramp,
+                        args.seed,
+                    )
+                finally:
+                    sampler.cancel()
+
+            start_time = time.time()
+            timings, failures = asyncio.run(main())
+            elapsed = time.time() - start_time
+        finally:
+            process.terminate()
+            process.wait()
+            data.shutdown()
+            cdn.shutdown()
+
+    peak = max(peak) if baseline is not None else None
+
+    return {
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "config": {
+            key: getattr(args, key)
+            for key in [
+                "sessions",
+                "rounds",
+                "think",
+                "ramp",
+                "cdn_latency",
+                "cdn_missing",
+                "image_size",
+                "refresh_interval",
+                "seed",
+            ]
+        },
+        "elapsed": round(elapsed, 2),
+        "failures": len(failures),
+        "errors": failures[:20],
+        "latency": {name: summarize(timings[name]) for name in sorted(timings)},
+        "memory": {
+            "baseline_mb": baseline,
+            "peak_mb": peak,
+            "per_session_mb": (
+                (peak - baseline) / args.sessions if baseline is not None else None
+            ),
+        },
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the Shiny app")
+    parser.add_argument("--sessions", type=int, default=20, help="concurrent sessions")
+    parser.add_argument("--rounds", type=int, default=5, help="rounds per session")
+    parser.add_argument("--think", type=float, default=100, help="ms between actions")
+    parser.add_argument("--ramp", type=float, default=5, help="s to start all sessions")
+    parser.add_argument("--cdn-latency", type=float, default=50, help="image CDN ms")
+    parser.add_argument(
+        "--cdn-missing", type=float, default=0.1, help="share of missing headshots"
+    )
+    parser.add_argument("--image-size", type=int, default=20000, help="image bytes")
+    parser.add_argument(
+        "--refresh-interval", type=float, default=30, help="s between data refreshes"
+    )
+    parser.add_argument(
+        "--data", default=str(DATA_PATH.parent), help="data folder to serve"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    parser.add_argument("--output", help="file to save results to")
+    parser.add_argument("--baseline", help="results file to compare against")
+
+    args = parser.parse_args()
+
+    results = run(args)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    report(results, baseline)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
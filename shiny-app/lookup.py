@@ -0,0 +1,69 @@
+# Imports
+from types import MappingProxyType
+
+import numpy as np
+
+# Starting value of the guess input
+NO_GUESS = "Type Your Guess Here"
+
+
+# Function to index the per game display table, which is sorted by player id
+#
+# Returns the player ids, the start and end row of each player and the guess label of each player.
+# Players who share a name are labeled with their years.
+def index(players):
+    ids = players["ID"].to_numpy()
+
+    # Each player's rows are contiguous, find where each player starts and ends
+    starts = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]])
+    ends = np.r_[starts[1:], len(ids)]
+
+    # First row of each player has the name and first season, last row the last season
+    names = players["Name"].iloc[starts].astype(str).to_numpy()
+    first = players["Year"].to_numpy()[starts]
+    last = players["Year"].to_numpy()[ends - 1]
+
+    # Label shared names with years
+    _, inverse, counts = np.unique(names, return_inverse=True, return_counts=True)
+    labels = [
+        f"{name} ({x}-{y})" if counts[i] > 1 else name
+        for name, i, x, y in zip(names, inverse, first.tolist(), last.tolist())
+    ]
+
+    return ids[starts], starts, ends, labels
+
+
+# Immutable player lookups, built once from the display table and its index
+#
+# Guesses are player ids, so two players who share a name never collide. Each player's rows are a
+# contiguous range of the display table.
+class Lookup:
+    def __init__(self, players, ids, starts, ends, labels):
+        ids = ids.tolist()
+        names = players["Name"].iloc[np.asarray(starts)].astype(str).tolist()
+
+        # Guess choices sorted by label, with a starting guess
+        choices = {NO_GUESS: NO_GUESS}
+        for label, player_id in sorted(zip(labels, ids)):
+            choices[str(player_id)] = label
+
+        self.players = players
+        self.names = MappingProxyType(dict(zip(ids, names)))
+        self.ranges = MappingProxyType(
+            dict(zip(ids, zip(np.asarray(starts).tolist(), np.asarray(ends).tolist())))
+        )
+        self.choices = MappingProxyType(choices)
+
+    # Function to get the player id for a guess input value, None if it isn't a player
+    def guess(self, value):
+        try:
+            player_id = int(value)
+        except (TypeError, ValueError):
+            return None
+
+        return player_id if player_id in self.names else None
+
+    # Function to get a player's display rows
+    def rows(self, player_id):
+        start, end = self.ranges[player_id]
+        return self.players.iloc[start:end]
@@ -0,0 +1,146 @@
+# Imports
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+
+# Turn on instrumentation, off by default so render functions run unwrapped
+ENABLED = os.environ.get("NBA_METRICS", "").lower() in ["1", "true", "yes"]
+
+# Seconds between structured log lines while enabled, 0 to only serve /metrics
+INTERVAL = float(os.environ.get("NBA_METRICS_INTERVAL", 60))
+
+# Upper bounds of the wall time histogram buckets, in milliseconds
+BUCKETS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, float("inf")]
+
+
+# Process-wide counters and wall time histograms of the instrumented functions
+class Metrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = {}
+        self.totals = {}
+        self.histograms = {}
+
+        # Callables that report counters kept elsewhere, like cache hits
+        self.sources = {}
+
+    # Function to record one call
+    def record(self, name, seconds):
+        ms = seconds * 1000
+        bucket = next(x for x, bound in enumerate(BUCKETS) if ms <= bound)
+
+        with self.lock:
+            if name not in self.counts:
+                self.counts[name], self.totals[name] = 0, 0.0
+                self.histograms[name] = [0] * len(BUCKETS)
+
+            self.counts[name] += 1
+            self.totals[name] += ms
+            self.histograms[name][bucket] += 1
+
+    # Function to add counters kept elsewhere to the snapshot
+    def source(self, name, fn):
+        self.sources[name] = fn
+
+    # Function to get all metrics as a dict
+    def snapshot(self):
+        with self.lock:
+            outputs = {
+                name: {
+                    "count": count,
+                    "total_ms": round(self.totals[name], 3),
+                    "mean_ms": round(self.totals[name] / count, 3),
+                    "histogram_ms": {
+                        f"le_{bound:g}": n
+                        for bound, n in zip(BUCKETS, self.histograms[name])
+                    },
+                }
+                for name, count in self.counts.items()
+            }
+
+        snapshot = {"time": time.time(), "outputs": outputs}
+        for name, fn in self.sources.items():
+            snapshot[name] = fn()
+
+        return snapshot
+
+
+# Metrics shared by every session
+metrics = Metrics()
+
+
+# Function to get hits, misses and the hit ratio of a cache
+def ratio(hits, misses):
+    total = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": round(hits / total, 4) if total else None,
+    }
+
+
+# Decorator to time a render function, returns the function unchanged when disabled
+def timed(name):
+    def decorator(fn):
+        if not ENABLED:
+            return fn
+
+        if inspect.iscoroutinefunction(fn):
+
+            @functools.wraps(fn)
+            async def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await fn(*args, **kwargs)
+                finally:
+                    metrics.record(name, time.perf_counter() - start)
+
+        else:
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    metrics.record(name, time.perf_counter() - start)
+
+        return wrapper
+
+    return decorator
+
+
+# Periodic structured log of the metrics
+def log(interval):
+    while True:
+        time.sleep(interval)
+        print(json.dumps({"metrics": metrics.snapshot()}), flush=True)
+
+
+# Function to serve the metrics at /metrics in front of an ASGI app, returns the app unchanged when disabled
+def serve(app):
+    if not ENABLED:
+        return app
+
+    if INTERVAL:
+        threading.Thread(target=log, args=(INTERVAL,), daemon=True).start()
+
+    async def wrapper(scope, receive, send):
+        if scope["type"] == "http" and scope["path"] == "/metrics":
+            body = json.dumps(metrics.snapshot()).encode()
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": 200,
+                    "headers": [(b"content-type", b"application/json")],
+                }
+            )
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        await app(scope, receive, send)
+
+    return wrapper
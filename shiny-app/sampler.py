@@ -0,0 +1,102 @@
+# Imports
+from functools import lru_cache
+
+import numpy as np
+
+# Filter combinations to keep eligible players for
+CACHE_SIZE = 1024
+
+
+# Function to summarize each player's career from the per game display table and team stints
+#
+# One row per player: id, peak PPG, first and last season year and season count. Team seasons have
+# one row per player, team and season, grouped by team and sorted by year within a team: the
+# seasons of team i are TeamRow[TeamStarts[i]:TeamStarts[i + 1]]. Returns (summary, teams).
+def summarize(players, stints):
+    careers = players.groupby("ID", sort=True, observed=True).agg(
+        Peak=("PTS", "max"),
+        First=("Year", "min"),
+        Last=("Year", "max"),
+        Seasons=("Year", "nunique"),
+    )
+
+    # Seasons on each team, stints with no team are dropped
+    seasons = (
+        stints.dropna(subset=["Team"])
+        .assign(
+            Team=lambda x: x["Team"].astype(str).astype("category"),
+            Year=lambda x: x["Season"].astype(str).str[:4].astype(int),
+        )
+        .drop_duplicates(["Team", "Year", "ID"])
+        .sort_values(["Team", "Year", "ID"])
+    )
+    teams = seasons["Team"].cat.remove_unused_categories()
+    codes = teams.cat.codes.to_numpy()
+
+    summary = {
+        "ID": careers.index.to_numpy(),
+        "Peak": careers["Peak"].to_numpy(dtype=float),
+        "First": careers["First"].to_numpy(),
+        "Last": careers["Last"].to_numpy(),
+        "Seasons": careers["Seasons"].to_numpy(),
+        "TeamRow": np.searchsorted(careers.index.to_numpy(), seasons["ID"].to_numpy()),
+        "TeamYear": seasons["Year"].to_numpy(),
+        "TeamStarts": np.searchsorted(codes, np.arange(len(teams.cat.categories) + 1)),
+    }
+
+    return summary, teams.cat.categories.astype(str).tolist()
+
+
+# Random player sampler, built once from the career summary
+#
+# A player is eligible for a (year range, minimum PPG, team) query if their career overlaps the
+# years and their peak PPG is at least the minimum. With a team, they must have played a season in
+# the range for that team. Eligible players are found with vectorized comparisons over one row per
+# player and a binary search of the team's seasons, and cached per filter combination.
+class Sampler:
+    def __init__(self, summary, teams):
+        self.summary = summary
+        self.teams = {team: code for code, team in enumerate(teams)}
+
+        # Eligible players per filter combination
+        self.eligible = lru_cache(maxsize=CACHE_SIZE)(self.filter)
+
+    # Function to find the ids of eligible players
+    def filter(self, first, last, min_points, team):
+        summary = self.summary
+
+        # Career overlaps the years and peak PPG meets the minimum
+        mask = (
+            (summary["First"] <= last)
+            & (summary["Last"] >= first)
+            & (summary["Peak"] >= min_points)
+        )
+
+        # Played for the team during the years
+        if team != "All":
+            code = self.teams[team]
+            start, end = summary["TeamStarts"][code : code + 2]
+
+            # Team seasons are sorted by year, find the ones in the range
+            years = summary["TeamYear"][start:end]
+            start, end = start + np.searchsorted(years, [first, last + 1])
+
+            played = np.zeros(len(mask), dtype=bool)
+            played[summary["TeamRow"][start:end]] = True
+            mask &= played
+
+        return summary["ID"][mask]
+
+    # Function to draw a random player id, returns None if no players meet the criteria
+    def sample(self, season_range=(1946, 2023), min_points=0.0, team="All", rng=None):
+        if team != "All" and team not in self.teams:
+            return None
+
+        ids = self.eligible(
+            int(season_range[0]), int(season_range[1]), float(min_points), team
+        )
+        if not len(ids):
+            return None
+
+        # Draw an eligible player uniformly
+        return ids[(rng if rng else np.random).randint(len(ids))]
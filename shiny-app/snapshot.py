@@ -0,0 +1,132 @@
+"""
+Exports the prepared player data to a read-only, memory-mapped snapshot, run at deploy time:
+  python snapshot.py
+
+Every column, career summary and index array is a .npy file, text columns are stored as codes
+with their categories in vocab.json. Workers attach to the snapshot with memory maps, so startup
+is a file open and the OS shares the pages across worker processes.
+"""
+
+# Imports
+import json
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Snapshot directory, next to the bundled data
+SNAPSHOT_PATH = Path(
+    os.environ.get("NBA_SNAPSHOT_PATH", Path(__file__).parent / "data" / "snapshot")
+)
+
+# Snapshot format version, bump whenever the exported files or their contents change
+# 2: career summary, 3: one row per player-season, 4: player-seasons from code/convert.py,
+# 5: team seasons in place of the team bitmask
+VERSION = 5
+
+
+# Function to export prepared players and their indexes to a snapshot directory
+def export(data, directory=SNAPSHOT_PATH):
+    directory = Path(directory)
+
+    # Write to a staging directory, then move it into place
+    staging = directory.with_name(f"{directory.name}.{os.getpid()}.tmp")
+    shutil.rmtree(staging, ignore_errors=True)
+    staging.mkdir(parents=True)
+
+    vocab = {
+        "version": VERSION,
+        "columns": list(data.players.columns),
+        "categories": {},
+    }
+
+    # Display table columns, text columns as category codes
+    for column in data.players.columns:
+        values = data.players[column]
+        if not pd.api.types.is_numeric_dtype(values):
+            values = values.astype("category")
+            vocab["categories"][column] = values.cat.categories.astype(str).tolist()
+            values = values.cat.codes
+
+        np.save(staging / f"column-{column}.npy", values.to_numpy())
+
+    # Career summary
+    for key, values in data.sampler.summary.items():
+        np.save(staging / f"career-{key}.npy", values)
+
+    vocab["teams"] = list(data.sampler.teams)
+
+    # Lookup index
+    ids = np.array(list(data.lookup.ranges.keys()))
+    ranges = np.array(list(data.lookup.ranges.values())).reshape(-1, 2)
+    np.save(staging / "lookup-ids.npy", ids)
+    np.save(staging / "lookup-ranges.npy", ranges)
+    vocab["labels"] = [data.lookup.choices[str(x)] for x in ids.tolist()]
+
+    with open(staging / "vocab.json", "w") as f:
+        json.dump(vocab, f)
+
+    # Replace any previous snapshot
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(staging, directory)
+
+
+# Function to attach to a snapshot, returns (players, (summary, teams), (ids, starts, ends, labels))
+#
+# Raises ValueError if the snapshot was exported in another format.
+def attach(directory=SNAPSHOT_PATH):
+    directory = Path(directory)
+
+    with open(directory / "vocab.json") as f:
+        vocab = json.load(f)
+
+    if vocab.get("version") != VERSION:
+        raise ValueError(f"Snapshot format {vocab.get('version')}, expected {VERSION}")
+
+    # Display table over memory mapped columns, without copying them
+    columns = {}
+    for column in vocab["columns"]:
+        values = np.load(directory / f"column-{column}.npy", mmap_mode="r")
+        if column in vocab["categories"]:
+            values = pd.Categorical.from_codes(
+                values, categories=vocab["categories"][column]
+            )
+
+        columns[column] = values
+
+    players = pd.DataFrame(columns, copy=False)
+
+    # Career summary
+    summary = {
+        key: np.load(directory / f"career-{key}.npy", mmap_mode="r")
+        for key in [
+            "ID",
+            "Peak",
+            "First",
+            "Last",
+            "Seasons",
+            "TeamRow",
+            "TeamYear",
+            "TeamStarts",
+        ]
+    }
+
+    # Lookup index
+    ranges = np.load(directory / "lookup-ranges.npy", mmap_mode="r")
+    index = (
+        np.load(directory / "lookup-ids.npy", mmap_mode="r"),
+        ranges[:, 0],
+        ranges[:, 1],
+        vocab["labels"],
+    )
+
+    return players, (summary, vocab["teams"]), index
+
+
+if __name__ == "__main__":
+    from dataset import DATA_PATH, Prepared, read_prepared
+
+    export(Prepared(*read_prepared(DATA_PATH)))
+    print(f"Exported {DATA_PATH} to {SNAPSHOT_PATH}")